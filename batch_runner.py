@@ -0,0 +1,277 @@
+"""
+Run many pipeline jobs from a JSONL file in one process tree.
+
+Each line of the jobs file describes one main.py run, with the same options:
+
+    {"id": "appsflyer-ladder", "input_file": "appsflyer.csv", "rows": [100, 1000, 5000], "columns": 10, "seed": 1}
+    {"id": "sales-5k", "input_file": "sales_data.csv", "rows": 5000, "format": "parquet", "eval_format": "jsonl"}
+
+Jobs run on a bounded pool of threads in this process, so they pay the pandas and
+google-genai imports once and share:
+- one Gemini client (rate limit, circuit breakers, and the replay cassette or stub server)
+- one row function cache (concurrent jobs for the same sample and columns wait for a
+  single Gemini call)
+- the process-wide Faker value pools (worker processes of jobs with workers > 1 are
+  spawned, not forked, and build their own unless --pool-dir is set)
+
+Each job's output goes to its own log file. As jobs finish, one line per job is
+appended to the results JSONL with its status, timing, output folders and error. Job
+metrics (metrics: true) count CPU time of the job's own thread, but peak RSS is that
+of the whole batch process.
+
+Usage:
+    python batch_runner.py jobs.jsonl --jobs 4 --results batch_results.jsonl
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from llm_backends import DEFAULT_CASSETTE, LLM_MODES, create_backend
+from llm_client import GeminiClient
+from main import DatasetPipeline, build_pipeline
+from row_function_cache import DEFAULT_CACHE_DIR, RowFunctionCache
+from value_pools import DEFAULT_POOL_SIZE
+
+
+# Job spec key -> pipeline argument, for the options a job may set itself
+JOB_OPTIONS = {
+    'base_dir': 'base_dir',
+    'seed': 'seed',
+    'workers': 'workers',
+    'chunk_size': 'chunk_size',
+    'format': 'output_format',
+    'eval_format': 'eval_format',
+    'custom_metrics': 'custom_metrics_file',
+    'force': 'force_stages',
+    'metrics': 'metrics',
+    'metrics_textfile': 'metrics_textfile',
+    'refresh_cache': 'refresh_cache'
+}
+
+
+class _JobOutput(io.TextIOBase):
+    """sys.stdout stand-in that sends each job thread's prints to that job's log."""
+
+    def __init__(self, default):
+        self.default = default
+        self._local = threading.local()
+
+    def set_stream(self, stream):
+        self._local.stream = stream
+
+    def _stream(self):
+        return getattr(self._local, 'stream', None) or self.default
+
+    def write(self, text: str) -> int:
+        return self._stream().write(text)
+
+    def flush(self):
+        self._stream().flush()
+
+
+def _counts(value: Any, name: str) -> Optional[List[int]]:
+    """A job's rows/columns: an integer, a list of integers or a comma-separated string."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.split(',')
+    counts = [int(count) for count in (value if isinstance(value, list) else [value])]
+    if not counts or min(counts) <= 0:
+        raise ValueError(f"'{name}' must be positive")
+    return counts
+
+
+def read_jobs(path: str) -> List[Dict[str, Any]]:
+    """Job specs of a JSONL file; every job gets an id (default: job-<line number>)."""
+    jobs = []
+    with open(path, 'r') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            spec = json.loads(line)
+            spec.setdefault('id', f"job-{line_number}")
+            spec['line'] = line_number
+            jobs.append(spec)
+
+    ids = [job['id'] for job in jobs]
+    duplicates = sorted({job_id for job_id in ids if ids.count(job_id) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate job ids in {path}: {duplicates}")
+    return jobs
+
+
+def _pipeline_for(spec: Dict[str, Any], shared: Dict[str, Any]):
+    unknown = set(spec) - set(JOB_OPTIONS) - {'id', 'line', 'input_file', 'rows', 'columns'}
+    if unknown:
+        raise ValueError(f"Unknown job options {sorted(unknown)}, expected some of {sorted(JOB_OPTIONS)}")
+    if 'input_file' not in spec or 'rows' not in spec:
+        raise ValueError("A job needs 'input_file' and 'rows'")
+
+    options = dict(shared)
+    options.update({JOB_OPTIONS[key]: value for key, value in spec.items() if key in JOB_OPTIONS})
+    if isinstance(options.get('force_stages'), str):
+        options['force_stages'] = [options['force_stages']]
+    return build_pipeline(spec['input_file'], _counts(spec['rows'], 'rows'), _counts(spec.get('columns'), 'columns'), **options)
+
+
+def run_job(spec: Dict[str, Any], shared: Dict[str, Any], log_dir: Path, output: _JobOutput) -> Dict[str, Any]:
+    """Run one job with its prints going to <log_dir>/<id>.log. Never raises; returns its status line."""
+    status = {'id': spec['id'], 'line': spec['line'], 'status': 'failed', 'started_at': datetime.now().isoformat()}
+    log_path = log_dir / f"{spec['id']}.log"
+    started = time.perf_counter()
+    pipeline = None
+
+    with open(log_path, 'w') as log:
+        output.set_stream(log)
+        try:
+            pipeline = _pipeline_for(spec, shared)
+            pipelines = pipeline.pipelines if hasattr(pipeline, 'pipelines') else [pipeline]
+            status['output_dirs'] = [str(size.output_dir) for size in pipelines]
+            pipeline.execute()
+            status['status'] = 'completed'
+        except Exception as e:
+            status['error'] = f"{type(e).__name__}: {e}"
+            log.write(traceback.format_exc())
+            if isinstance(pipeline, DatasetPipeline):
+                pipeline.write_metrics('failed')
+        finally:
+            output.set_stream(None)
+
+    status.update(
+        finished_at=datetime.now().isoformat(),
+        wall_seconds=round(time.perf_counter() - started, 3),
+        log=str(log_path)
+    )
+    return status
+
+
+def run_batch(
+    jobs_path: str,
+    results_path: str = "batch_results.jsonl",
+    log_dir: str = "batch_logs",
+    max_jobs: int = 2,
+    llm_mode: str = 'live',
+    api_key: Optional[str] = None,
+    cassette_path: str = DEFAULT_CASSETTE,
+    replay_latency: float = 0.0,
+    requests_per_minute: Optional[float] = 60,
+    use_cache: bool = True,
+    cache_dir: str = DEFAULT_CACHE_DIR,
+    **pipeline_options
+) -> List[Dict[str, Any]]:
+    """Run every job of a JSONL file, at most max_jobs at a time, sharing one client and cache.
+
+    pipeline_options are DatasetPipeline arguments applied to every job (e.g. base_dir,
+    pool_size, pool_dir, hedge_delay); jobs may override those listed in JOB_OPTIONS.
+    Returns the status line of every job, in completion order.
+    """
+    jobs = read_jobs(jobs_path)
+    log_dir = Path(log_dir)
+    log_dir.mkdir(parents=True, exist_ok=True)
+
+    backend = create_backend(llm_mode, api_key=api_key or os.getenv('GEMINI_API_KEY'),
+                             cassette_path=cassette_path, latency=replay_latency)
+    if llm_mode in ('replay', 'stub'):
+        # Local responses: rate limiting would only slow the batch down
+        requests_per_minute = None
+    shared = dict(
+        pipeline_options,
+        llm_client=GeminiClient(requests_per_minute=requests_per_minute, backend=backend),
+        cache=RowFunctionCache(cache_dir) if use_cache else None,
+        use_cache=use_cache
+    )
+
+    print(f"🚀 Running {len(jobs)} job(s) from {jobs_path}, {min(max_jobs, len(jobs))} at a time")
+    statuses = []
+    output = _JobOutput(sys.stdout)
+    sys.stdout = output
+    try:
+        with ThreadPoolExecutor(max_workers=max_jobs) as executor, open(results_path, 'w') as results:
+            futures = [executor.submit(run_job, spec, shared, log_dir, output) for spec in jobs]
+            for future in as_completed(futures):
+                status = future.result()
+                results.write(json.dumps(status) + '\n')
+                results.flush()
+                statuses.append(status)
+                icon = '✅' if status['status'] == 'completed' else '❌'
+                detail = f" ({status['error']})" if 'error' in status else ""
+                print(f"{icon} {status['id']}: {status['status']} in {status['wall_seconds']:.1f}s{detail}")
+    finally:
+        sys.stdout = output.default
+        if getattr(backend, 'server', None) is not None:
+            backend.server.stop()
+
+    failed = sum(status['status'] != 'completed' for status in statuses)
+    cache = shared['cache']
+    print(f"\n📊 {len(statuses) - failed} completed, {failed} failed; results: {results_path}, logs: {log_dir}/")
+    if cache is not None:
+        stats = cache.stats()
+        print(f"💾 Row function cache: {stats['hits']} hit(s), {stats['misses']} miss(es)")
+    for model, stats in shared['llm_client'].metrics().items():
+        print(f"📡 {model}: {stats['attempts']} call(s), {stats['failures']} failed")
+    if any(job.get('metrics') or job.get('metrics_textfile') for job in jobs) or pipeline_options.get('metrics'):
+        print("📈 Job metrics: cpu_seconds is each job's own thread; peak_rss_bytes is the whole batch process")
+    return statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run many dataset pipeline jobs from a JSONL file, sharing one Gemini client and cache')
+    parser.add_argument('jobs_file', help='JSONL file, one job per line: {"id", "input_file", "rows", "columns", ...}')
+    parser.add_argument('--jobs', '-j', type=int, default=2, help='Jobs running at the same time (default: 2)')
+    parser.add_argument('--results', default='batch_results.jsonl', help='Per-job status and timing JSONL (default: batch_results.jsonl)')
+    parser.add_argument('--log-dir', default='batch_logs', help='Directory for per-job logs (default: batch_logs)')
+    parser.add_argument('--base-dir', '-b', default='datasets', help='Base directory for datasets (default: datasets)')
+    parser.add_argument('--api-key', '-k', help='Gemini API key (or set GEMINI_API_KEY env var)')
+    parser.add_argument('--rpm', type=float, default=60, help='Max Gemini requests per minute across all jobs (default: 60, 0 disables)')
+    parser.add_argument('--hedge-delay', type=float, help='Race models: start a backup model after this many seconds (0 = all at once)')
+    parser.add_argument('--model-timeout', type=float, default=120.0, help='Timeout in seconds for each model request (default: 120)')
+    parser.add_argument('--llm-mode', choices=LLM_MODES, default='live', help='live, record, replay or stub (default: live)')
+    parser.add_argument('--cassette', default=DEFAULT_CASSETTE, help=f'Cassette file for record/replay/stub (default: {DEFAULT_CASSETTE})')
+    parser.add_argument('--replay-latency', type=float, default=0.0, help='Synthetic latency in seconds per replayed response (default: 0)')
+    parser.add_argument('--pool-size', type=int, default=DEFAULT_POOL_SIZE, help=f'Values pre-generated per Faker provider (default: {DEFAULT_POOL_SIZE})')
+    parser.add_argument('--pool-dir', help='Directory to persist and reuse Faker value pools, also across worker processes (optional)')
+    parser.add_argument('--unique-pools', action='store_true', help='Build pools of distinct values')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help=f'Row function cache directory (default: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--no-cache', action='store_true', help='Always call Gemini; do not read or write the row function cache')
+
+    args = parser.parse_args()
+
+    if args.jobs <= 0:
+        print("❌ Error: Number of jobs must be positive")
+        sys.exit(1)
+
+    statuses = run_batch(
+        args.jobs_file,
+        results_path=args.results,
+        log_dir=args.log_dir,
+        max_jobs=args.jobs,
+        llm_mode=args.llm_mode,
+        api_key=args.api_key,
+        cassette_path=args.cassette,
+        replay_latency=args.replay_latency,
+        requests_per_minute=args.rpm or None,
+        use_cache=not args.no_cache,
+        cache_dir=args.cache_dir,
+        base_dir=args.base_dir,
+        hedge_delay=args.hedge_delay,
+        model_timeout=args.model_timeout,
+        pool_size=args.pool_size,
+        pool_dir=args.pool_dir,
+        unique_pools=args.unique_pools
+    )
+    if any(status['status'] != 'completed' for status in statuses):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
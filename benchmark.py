@@ -0,0 +1,238 @@
+"""
+Offline benchmark of the generation and eval engines across data sizes.
+
+Runs with no network: rows come from the fallback row function fitted on the sample
+(or from a row function replayed from a cassette with --cassette). For every size it
+times row generation, writing the table, loading it for evals, each eval category on
+its own and all categories from one shared plan, using the pipeline's Telemetry, so
+each step also reports CPU time, peak RSS and rows/sec, along with its sub-steps
+(e.g. "eval_aggregation/execute").
+
+Usage:
+    python benchmark.py run --sizes 1e3,1e5,1e6,1e7 --output benchmarks/base.json
+    python benchmark.py run --sizes 1e3,1e5,1e6 --output benchmarks/new.json
+    python benchmark.py compare benchmarks/base.json benchmarks/new.json --threshold 0.1
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from data_io import FORMAT_EXTENSIONS, OUTPUT_FORMATS, write_table
+from generate_eval_datasets import EVAL_CATEGORIES, EvalDatasetGenerator, _category_seeds
+from llm_backends import ReplayBackend
+from llm_client import GeminiClient
+from synthetic_data_generator import SyntheticDataGenerator
+from telemetry import Telemetry
+
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000, 10_000_000]
+DEFAULT_SAMPLE = "datasets/Appsflyer/appsflyer_sample.csv"
+# Cases per category, as in generate_all_evals
+EVAL_CASES = {'aggregation': 20, 'time_comparison': 15, 'custom_metrics': 15}
+
+
+def _sizes(value: str) -> List[int]:
+    """argparse type for comma-separated sizes, e.g. 1e3,1e5,1000000."""
+    try:
+        sizes = [int(float(part)) for part in value.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected comma-separated row counts, got '{value}'")
+    if min(sizes) <= 0:
+        raise argparse.ArgumentTypeError("row counts must be positive")
+    return sizes
+
+
+def _row_function(sample_path: str, num_columns: Optional[int], cassette: Optional[str]) -> tuple:
+    """Generator and row function code, without any network access."""
+    if cassette:
+        generator = SyntheticDataGenerator(llm_mode='replay', cassette_path=cassette)
+        _, analysis = generator.analyze_sample_csv(sample_path)
+        return generator, generator.generate_row_function(analysis, num_columns)
+
+    # An empty replay backend: nothing is ever sent, the fallback is fitted on the sample
+    generator = SyntheticDataGenerator(llm_client=GeminiClient(requests_per_minute=None, backend=ReplayBackend(os.devnull)))
+    _, analysis = generator.analyze_sample_csv(sample_path)
+    columns = analysis['columns'][:num_columns] if num_columns else analysis['columns']
+    return generator, generator._generate_fallback_function(columns, analysis['profile'])
+
+
+def benchmark_size(generator: SyntheticDataGenerator, function_code: str, num_rows: int, work_dir: str,
+                   workers: int = 1, seed: int = 42, output_format: str = 'csv') -> Dict[str, Dict[str, Any]]:
+    """Time every step once at num_rows. Returns the telemetry report's steps by name."""
+    telemetry = Telemetry()
+    path = os.path.join(work_dir, f"benchmark_{num_rows}{FORMAT_EXTENSIONS[output_format]}")
+
+    with telemetry.step('generate', rows=num_rows):
+        df = generator.execute_generation(function_code, num_rows, workers=workers, seed=seed)
+    with telemetry.step('write', rows=num_rows):
+        write_table(df, path, output_format)
+    del df
+
+    with telemetry.step('eval_load', rows=num_rows):
+        loaded = EvalDatasetGenerator(path, telemetry=telemetry)
+
+    # Each category from its own plan, then all of them from one shared plan
+    seeds = _category_seeds(seed)
+    runs = [[category] for category in EVAL_CATEGORIES] + [list(EVAL_CATEGORIES)]
+    for categories in runs:
+        name = f"eval_{categories[0]}" if len(categories) == 1 else "eval_all"
+        evals = EvalDatasetGenerator(loaded.df, categories=categories, optimize_memory=False, telemetry=telemetry)
+        with telemetry.step(name, rows=num_rows):
+            evals.generate_evals({category: EVAL_CASES[category] for category in categories}, seeds)
+
+    os.remove(path)
+    return {step['step']: step for step in telemetry.report()['steps']}
+
+
+def run_benchmarks(sizes: List[int], sample_path: str = DEFAULT_SAMPLE, num_columns: Optional[int] = 10,
+                   cassette: Optional[str] = None, repeat: int = 1, workers: int = 1, seed: int = 42,
+                   output_format: str = 'csv', verbose: bool = False) -> Dict[str, Any]:
+    """Benchmark every size `repeat` times, keeping each step's fastest run."""
+    quiet = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    with quiet:
+        generator, function_code = _row_function(sample_path, num_columns, cassette)
+
+    results = []
+    work_dir = tempfile.mkdtemp(prefix='benchmark_')
+    try:
+        for num_rows in sizes:
+            best: Dict[str, Dict[str, Any]] = {}
+            for attempt in range(repeat):
+                print(f"⏱️  {num_rows:,} rows (run {attempt + 1}/{repeat})...")
+                quiet = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+                with quiet:
+                    steps = benchmark_size(generator, function_code, num_rows, work_dir, workers, seed, output_format)
+                for name, step in steps.items():
+                    if name not in best or step['wall_seconds'] < best[name]['wall_seconds']:
+                        best[name] = step
+            for name, step in best.items():
+                results.append({'size': num_rows, **step})
+                if '/' not in name:
+                    rate = f" ({step['rows_per_second']:,.0f} rows/s)" if step['rows_per_second'] else ""
+                    print(f"   {name}: {step['wall_seconds']:.3f}s{rate}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        'created_at': datetime.now().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__
+        },
+        'config': {
+            'sizes': sizes,
+            'sample': sample_path,
+            'columns': num_columns,
+            'row_function': 'replay' if cassette else 'fallback',
+            'repeat': repeat,
+            'workers': workers,
+            'seed': seed,
+            'format': output_format
+        },
+        'results': results
+    }
+
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.10,
+                    min_seconds: float = 0.05) -> List[Dict[str, Any]]:
+    """Per (size, step) wall-time change from baseline to current.
+
+    A step regressed when it got slower by more than `threshold` (a fraction) and took
+    at least min_seconds in either run, so timer noise on tiny steps is not flagged.
+    """
+    base = {(entry['size'], entry['step']): entry for entry in baseline['results']}
+    rows = []
+    for entry in current['results']:
+        previous = base.get((entry['size'], entry['step']))
+        if previous is None:
+            continue
+        before, after = previous['wall_seconds'], entry['wall_seconds']
+        change = (after - before) / before if before > 0 else 0.0
+        rows.append({
+            'size': entry['size'],
+            'step': entry['step'],
+            'baseline_seconds': before,
+            'current_seconds': after,
+            'change': change,
+            'regression': change > threshold and max(before, after) >= min_seconds
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmark of generation and eval engines across data sizes')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='Run the benchmark and save JSON results')
+    run_parser.add_argument('--sizes', type=_sizes, default=DEFAULT_SIZES, help='Comma-separated row counts (default: 1e3,1e5,1e6,1e7)')
+    run_parser.add_argument('--sample', default=DEFAULT_SAMPLE, help=f'Sample CSV the row function is fitted on (default: {DEFAULT_SAMPLE})')
+    run_parser.add_argument('--columns', type=int, default=10, help='Leading sample columns to generate (default: 10, 0 = all)')
+    run_parser.add_argument('--cassette', help='Replay the row function from this cassette instead of using the fallback')
+    run_parser.add_argument('--repeat', type=int, default=1, help="Runs per size; each step's fastest run is kept (default: 1)")
+    run_parser.add_argument('--workers', '-w', type=int, default=1, help='Worker processes for row generation (default: 1)')
+    run_parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+    run_parser.add_argument('--format', '-f', choices=OUTPUT_FORMATS, default='csv', help='Table format written and loaded (default: csv)')
+    run_parser.add_argument('--output', '-o', help='Results file (default: benchmarks/benchmark_<timestamp>.json)')
+    run_parser.add_argument('--verbose', '-v', action='store_true', help='Show the engines\' own output')
+
+    compare_parser = subparsers.add_parser('compare', help='Compare two results files and flag regressions')
+    compare_parser.add_argument('baseline', help='Baseline results JSON')
+    compare_parser.add_argument('current', help='Current results JSON')
+    compare_parser.add_argument('--threshold', type=float, default=0.10, help='Slowdown that counts as a regression, as a fraction (default: 0.10)')
+    compare_parser.add_argument('--min-seconds', type=float, default=0.05, help='Ignore steps faster than this in both runs (default: 0.05)')
+
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        if args.repeat <= 0 or args.workers <= 0:
+            print("❌ Error: --repeat and --workers must be positive")
+            sys.exit(1)
+        report = run_benchmarks(args.sizes, args.sample, args.columns or None, args.cassette,
+                                args.repeat, args.workers, args.seed, args.format, args.verbose)
+        output = Path(args.output or f"benchmarks/benchmark_{datetime.now():%Y%m%d_%H%M%S}.json")
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"📄 Saved results: {output}")
+        return
+
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+    with open(args.current, 'r') as f:
+        current = json.load(f)
+    rows = compare_results(baseline, current, args.threshold, args.min_seconds)
+    if not rows:
+        print("⚠️  No (size, step) pairs in common")
+        sys.exit(1)
+
+    print(f"{'size':>12}  {'step':<40} {'baseline':>10} {'current':>10} {'change':>8}")
+    for row in rows:
+        flag = "  ❌ regression" if row['regression'] else ""
+        print(f"{row['size']:>12,}  {row['step']:<40} {row['baseline_seconds']:>9.3f}s {row['current_seconds']:>9.3f}s "
+              f"{row['change']:>+7.1%}{flag}")
+
+    regressions = [row for row in rows if row['regression']]
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}")
+        sys.exit(1)
+    print(f"\n✅ No regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""
+Mergeable aggregates for evaluating tables that do not fit in memory.
+
+GroupedAggregates keeps sum/count/min/max (and row counts) per group, one chunk
+at a time; partial states merge exactly, and mean is derived as sum / count.
+exact_medians finds exact medians by repeatedly histogramming the values and
+narrowing to the bin that holds the middle rank, then selecting in memory once
+few enough candidates remain. It needs a few passes over the data but never
+holds more than `max_buffer` values per column.
+"""
+
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+STATE_STATS = ['sum', 'count', 'min', 'max']
+# How each statistic of two partial states combines
+MERGE_FUNCTIONS = {'sum': 'sum', 'count': 'sum', 'min': 'min', 'max': 'max', 'rows': 'sum'}
+
+
+class GroupedAggregates:
+    """Mergeable per-group sum/count/min/max of `values`, grouped by the `by` columns.
+
+    With by=[] everything falls into a single group.
+    """
+
+    def __init__(self, by: List[str], values: List[str], compact_every: int = 32):
+        self.by = list(by)
+        self.values = list(values)
+        self.compact_every = compact_every
+        self._parts: List[pd.DataFrame] = []
+
+    def update(self, frame: pd.DataFrame):
+        """Fold a chunk (containing the `by` and `values` columns) into the state."""
+        if len(frame) == 0:
+            return
+        keys = [frame[col] for col in self.by] if self.by else np.zeros(len(frame), dtype=np.int8)
+        grouped = frame[self.values].groupby(keys, observed=True, sort=False)
+        rows = grouped.size().to_frame()
+        rows.columns = pd.MultiIndex.from_tuples([('', 'rows')])
+        # Without values (e.g. a projection without numeric columns) only rows are counted;
+        # columns are joined in one concat, as inserting them one by one fragments the frame
+        part = pd.concat([grouped.agg(STATE_STATS), rows], axis=1) if self.values else rows
+        self._parts.append(part)
+        if len(self._parts) >= self.compact_every:
+            self._parts = [self._combine(self._parts)]
+
+    def merge(self, other: 'GroupedAggregates'):
+        """Fold another partial state over the same columns into this one."""
+        self._parts.extend(other._parts)
+        if len(self._parts) >= self.compact_every:
+            self._parts = [self._combine(self._parts)]
+
+    def result(self) -> pd.DataFrame:
+        """Sorted by group; columns (value, stat) for sum, count, min, max and mean, plus ('', 'rows')."""
+        if not self._parts:
+            columns = pd.MultiIndex.from_product([self.values, STATE_STATS + ['mean']])
+            return pd.DataFrame(columns=columns)
+
+        combined = self._combine(self._parts).sort_index()
+        self._parts = [combined]
+
+        if not self.values:
+            return combined.copy()
+        means = {}
+        for value in self.values:
+            counts = combined[(value, 'count')]
+            means[(value, 'mean')] = combined[(value, 'sum')] / counts.where(counts > 0)
+        return pd.concat([combined, pd.DataFrame(means, index=combined.index)], axis=1)
+
+    @staticmethod
+    def _combine(parts: List[pd.DataFrame]) -> pd.DataFrame:
+        if len(parts) == 1:
+            return parts[0]
+        stacked = pd.concat(parts)
+        spec = {column: MERGE_FUNCTIONS[column[1]] for column in stacked.columns}
+        return stacked.groupby(level=list(range(stacked.index.nlevels)), observed=True, sort=False).agg(spec)
+
+
+def exact_medians(
+    scan: Callable[[], Iterable[Dict[str, np.ndarray]]],
+    stats: Dict[str, tuple],
+    max_buffer: int = 1_000_000,
+    bins: int = 4096
+) -> Dict[str, Optional[float]]:
+    """Exact medians of several value streams, matching pandas' median.
+
+    Args:
+        scan: Called once per pass; yields {name: array of non-null values} per chunk
+        stats: {name: (count, min, max)} from an earlier aggregate pass
+        max_buffer: Values held in memory per name for the final selection
+        bins: Histogram bins per narrowing pass
+
+    Returns:
+        {name: median}, None for names without values
+    """
+    medians: Dict[str, Optional[float]] = {}
+    # Per name: target ranks, [lo, hi] value range holding them, values below lo
+    state = {}
+    for name, (count, lo, hi) in stats.items():
+        if not count:
+            medians[name] = None
+        elif lo == hi:
+            medians[name] = float(lo)
+        else:
+            ranks = [(count - 1) // 2, count // 2]
+            state[name] = {
+                'ranks': ranks, 'lo': lo, 'hi': hi, 'hi_closed': True,
+                'below': 0, 'inside': count, 'exhausted': False
+            }
+
+    while state:
+        collecting = {name for name, s in state.items() if s['inside'] <= max_buffer or s['exhausted']}
+        histograms = {name: np.zeros(bins, dtype=np.int64) for name in state if name not in collecting}
+        edges = {name: np.linspace(state[name]['lo'], state[name]['hi'], bins + 1) for name in histograms}
+        buffers = {name: [] for name in collecting}
+
+        for chunk in scan():
+            for name, s in state.items():
+                values = chunk.get(name)
+                if values is None or len(values) == 0:
+                    continue
+                upper = values <= s['hi'] if s['hi_closed'] else values < s['hi']
+                values = values[(values >= s['lo']) & upper]
+                if name in collecting:
+                    buffers[name].append(values)
+                else:
+                    histograms[name] += np.histogram(values, bins=edges[name])[0]
+
+        for name in collecting:
+            s = state.pop(name)
+            values = np.sort(np.concatenate(buffers[name])) if buffers[name] else np.array([])
+            picks = [values[rank - s['below']] for rank in s['ranks']]
+            medians[name] = float((picks[0] + picks[1]) / 2)
+
+        for name, counts in histograms.items():
+            s = state[name]
+            cumulative = s['below'] + np.cumsum(counts)
+            first = int(np.searchsorted(cumulative, s['ranks'][0], side='right'))
+            last = int(np.searchsorted(cumulative, s['ranks'][1], side='right'))
+            lo, hi = edges[name][first], edges[name][last + 1]
+            s.update(
+                lo=lo,
+                hi=hi,
+                # np.histogram's last bin includes its upper edge
+                hi_closed=s['hi_closed'] and last == bins - 1,
+                below=s['below'] + int(counts[:first].sum()),
+                inside=int(counts[first:last + 1].sum()),
+                # Bins this narrow no longer split: select from what is left
+                exhausted=hi - lo <= np.spacing(max(abs(lo), abs(hi))) * bins
+            )
+
+    return medians
@@ -0,0 +1,377 @@
+import os
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+
+
+OUTPUT_FORMATS = ['csv', 'parquet', 'arrow']
+FORMAT_EXTENSIONS = {'csv': '.csv', 'parquet': '.parquet', 'arrow': '.arrow'}
+
+# String columns with at most this share of distinct values are dictionary-encoded
+CATEGORY_RATIO = 0.5
+
+
+def require_pyarrow(purpose: str = "parquet/arrow files"):
+    """The pyarrow module, or an ImportError naming what needed it and how to install it."""
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError(f"pyarrow is required for {purpose}: pip install pyarrow")
+    return pyarrow
+
+
+def detect_format(path: str) -> str:
+    """Infer the table format from a file extension (defaults to csv)."""
+    suffix = Path(path).suffix.lower()
+    for fmt, extension in FORMAT_EXTENSIONS.items():
+        if suffix == extension:
+            return fmt
+    if suffix in ('.feather', '.ipc'):
+        return 'arrow'
+    return 'csv'
+
+
+def _is_date_column(series: pd.Series) -> bool:
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return True
+    if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+        return False
+    head = series.dropna().head(100)
+    if head.empty:
+        return False
+    return bool(pd.to_datetime(head.astype(str), format='%Y-%m-%d', errors='coerce').notna().all())
+
+
+class TableWriter:
+    """Writes DataFrames to CSV, Parquet or Arrow IPC one chunk at a time.
+
+    For parquet/arrow the schema is fixed by the first chunk: ISO date columns become
+    a native date type, low-cardinality string columns are dictionary-encoded against
+    a dictionary that grows across chunks, and later chunks are cast to that schema.
+    Casts never lose data: an integer column that meets non-integral values in a later
+    chunk is widened to float64, rewriting the chunks already written.
+    """
+
+    def __init__(self, path: str, output_format: Optional[str] = None):
+        self.path = str(path)
+        self.output_format = output_format or detect_format(path)
+        if self.output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format '{self.output_format}', expected one of {OUTPUT_FORMATS}")
+        if self.output_format != 'csv':
+            require_pyarrow()
+
+        self.columns: Optional[List[str]] = None
+        self.rows_written = 0
+        self._csv_dtypes: Dict[str, str] = {}
+        self._schema = None
+        self._date_columns: List[str] = []
+        self._dictionaries: Dict[str, pd.Index] = {}
+        self._writer = None
+        self._sink = None
+
+    def __enter__(self) -> 'TableWriter':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def dtypes(self) -> Dict[str, str]:
+        """Column types as written (Arrow types for parquet/arrow)."""
+        if self._schema is not None:
+            return {field.name: str(field.type) for field in self._schema}
+        return dict(self._csv_dtypes)
+
+    def write(self, df: pd.DataFrame):
+        if self.columns is None:
+            self.columns = list(df.columns)
+        else:
+            df = df[self.columns]
+
+        if self.output_format == 'csv':
+            if self.rows_written == 0:
+                self._csv_dtypes = {col: str(dtype) for col, dtype in df.dtypes.items()}
+                df.to_csv(self.path, index=False, mode='w')
+            else:
+                df.to_csv(self.path, index=False, mode='a', header=False)
+        else:
+            batch = self._to_record_batch(df)
+            if self._writer is None:
+                self._open_writer()
+            if self.output_format == 'parquet':
+                import pyarrow as pa
+                self._writer.write_table(pa.Table.from_batches([batch]))
+            else:
+                self._writer.write_batch(batch)
+
+        self.rows_written += len(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if self._sink is not None:
+            self._sink.close()
+            self._sink = None
+
+    def _open_writer(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self.output_format == 'parquet':
+            self._writer = pq.ParquetWriter(self.path, self._schema)
+        else:
+            self._sink = pa.OSFile(self.path, 'wb')
+            # Dictionaries only grow (new values are appended), so later batches are deltas
+            options = pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+            self._writer = pa.ipc.new_file(self._sink, self._schema, options=options)
+
+    def _infer_schema(self, df: pd.DataFrame):
+        import pyarrow as pa
+
+        fields = []
+        for col in df.columns:
+            series = df[col]
+            if _is_date_column(series):
+                self._date_columns.append(col)
+                fields.append(pa.field(col, pa.date32()))
+            elif (isinstance(series.dtype, pd.CategoricalDtype)
+                    or pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)):
+                if series.nunique() <= max(1, len(series) * CATEGORY_RATIO):
+                    self._dictionaries[col] = pd.Index([], dtype=object)
+                    fields.append(pa.field(col, pa.dictionary(pa.int32(), pa.string())))
+                else:
+                    fields.append(pa.field(col, pa.string()))
+            else:
+                inferred = pa.Array.from_pandas(series).type
+                fields.append(pa.field(col, pa.float64() if pa.types.is_null(inferred) else inferred))
+        self._schema = pa.schema(fields)
+
+    def _to_record_batch(self, df: pd.DataFrame):
+        import pyarrow as pa
+
+        if self._schema is None:
+            self._infer_schema(df)
+        else:
+            self._widen_integers(df)
+
+        arrays = []
+        for field in self._schema:
+            series = df[field.name]
+            if field.name in self._dictionaries:
+                values = series.astype(object)
+                dictionary = self._dictionaries[field.name]
+                new_values = pd.Index(values.dropna().unique()).difference(dictionary, sort=False)
+                if len(new_values):
+                    dictionary = dictionary.append(new_values)
+                    self._dictionaries[field.name] = dictionary
+                codes = dictionary.get_indexer(values)
+                arrays.append(pa.DictionaryArray.from_arrays(
+                    pa.array(codes, type=pa.int32(), mask=codes < 0),
+                    pa.array(dictionary.astype(str), type=pa.string())
+                ))
+            elif field.name in self._date_columns:
+                dates = series
+                if not pd.api.types.is_datetime64_any_dtype(dates):
+                    dates = pd.to_datetime(series, format='%Y-%m-%d', errors='coerce')
+                arrays.append(pa.array(dates.values.astype('datetime64[D]'), type=pa.date32(), from_pandas=True))
+            elif pa.types.is_string(field.type):
+                arrays.append(pa.array(series.astype(object), type=pa.string(), from_pandas=True))
+            else:
+                arrays.append(pa.array(series, type=field.type, from_pandas=True))
+
+        return pa.RecordBatch.from_arrays(arrays, schema=self._schema)
+
+    def _widen_integers(self, df: pd.DataFrame):
+        """Switch integer columns to float64 when this chunk has values they cannot hold."""
+        import pyarrow as pa
+
+        widened = []
+        for i, field in enumerate(self._schema):
+            if not pa.types.is_integer(field.type) or pd.api.types.is_integer_dtype(df[field.name]):
+                continue
+            try:
+                pa.array(df[field.name], type=field.type, from_pandas=True)
+                continue
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                pass
+            try:
+                pa.array(df[field.name], type=pa.float64(), from_pandas=True)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                # Not numbers at all: the cast in _to_record_batch raises
+                continue
+            self._schema = self._schema.set(i, pa.field(field.name, pa.float64()))
+            widened.append(field.name)
+
+        if widened:
+            print(f"   ⚠️  Widening {widened} from integer to float64 in {self.path}")
+            if self._writer is not None:
+                self._rewrite()
+
+    def _rewrite(self):
+        """Rewrite the chunks written so far with the current (widened) schema."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.close()
+        previous = f"{self.path}.widening"
+        os.replace(self.path, previous)
+        try:
+            self._open_writer()
+            if self.output_format == 'parquet':
+                for batch in pq.ParquetFile(previous).iter_batches():
+                    self._writer.write_table(pa.Table.from_batches([batch]).cast(self._schema))
+            else:
+                with pa.memory_map(previous) as source:
+                    reader = pa.ipc.open_file(source)
+                    for i in range(reader.num_record_batches):
+                        self._writer.write_table(pa.Table.from_batches([reader.get_batch(i)]).cast(self._schema))
+        finally:
+            os.remove(previous)
+
+
+def write_table(df: pd.DataFrame, path: str, output_format: Optional[str] = None) -> Dict[str, str]:
+    """Write a DataFrame in one go. Returns the written column types."""
+    with TableWriter(path, output_format) as writer:
+        writer.write(df)
+        return writer.dtypes
+
+
+def read_table(path: str, columns: Optional[List[str]] = None, dtype: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+    """Read a CSV, Parquet or Arrow file, loading only `columns` if given.
+
+    Parquet/Arrow date columns come back as datetime64 and dictionary-encoded
+    columns as pandas categoricals, so no type inference or date parsing is needed.
+    `dtype` maps columns to pandas dtypes, applied while parsing CSV files.
+    """
+    output_format = detect_format(path)
+    if output_format == 'csv':
+        return pd.read_csv(path, usecols=columns, dtype=dtype)
+
+    require_pyarrow()
+    if output_format == 'parquet':
+        import pyarrow.parquet as pq
+        table = pq.read_table(path, columns=columns)
+    else:
+        import pyarrow.feather as feather
+        table = feather.read_table(path, columns=columns, memory_map=True)
+
+    df = table.to_pandas(date_as_object=False)
+    return df.astype(dtype) if dtype else df
+
+
+def as_read_back(df: pd.DataFrame, output_format: str = 'csv') -> pd.DataFrame:
+    """df with the column types read_table gives it once written in output_format.
+
+    Lets a caller keep using the frame it just wrote, with the same numeric and
+    categorical columns as a later read of the file. Generated frames can hold numbers
+    (mixed with None) in object columns: CSV parses those as numeric columns, while
+    parquet/arrow apply the writer's schema (string, dictionary and date columns).
+    """
+    if output_format == 'csv':
+        converted = {}
+        for col in df.columns:
+            if pd.api.types.is_object_dtype(df[col]) or pd.api.types.is_string_dtype(df[col]):
+                try:
+                    converted[col] = pd.to_numeric(df[col])
+                except (ValueError, TypeError):
+                    pass
+        return df.assign(**converted) if converted else df
+
+    import pyarrow as pa
+    batch = TableWriter(os.devnull, output_format)._to_record_batch(df)
+    return pa.Table.from_batches([batch]).to_pandas(date_as_object=False)
+
+
+def iter_table(
+    path: str,
+    columns: Optional[List[str]] = None,
+    chunk_size: int = 1_000_000,
+    dtype: Optional[Dict[str, str]] = None
+) -> Iterator[pd.DataFrame]:
+    """Read a CSV, Parquet or Arrow file as DataFrames of at most chunk_size rows."""
+    output_format = detect_format(path)
+    if output_format == 'csv':
+        with pd.read_csv(path, usecols=columns, dtype=dtype, chunksize=chunk_size) as reader:
+            yield from reader
+        return
+
+    require_pyarrow()
+    import pyarrow as pa
+    if output_format == 'parquet':
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size, columns=columns):
+            df = pa.Table.from_batches([batch]).to_pandas(date_as_object=False)
+            yield df.astype(dtype) if dtype else df
+        return
+
+    with pa.memory_map(path) as source:
+        reader = pa.ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            if columns is not None:
+                batch = batch.select(columns)
+            for offset in range(0, batch.num_rows, chunk_size):
+                df = pa.Table.from_batches([batch.slice(offset, chunk_size)]).to_pandas(date_as_object=False)
+                yield df.astype(dtype) if dtype else df
+
+
+def count_rows(path: str, chunk_size: int = 1_000_000) -> int:
+    """Rows in a table: from the file metadata for parquet/arrow, streaming one column of a CSV."""
+    output_format = detect_format(path)
+    if output_format == 'csv':
+        first_column = list(pd.read_csv(path, nrows=0).columns[:1])
+        return sum(len(chunk) for chunk in iter_table(path, columns=first_column, chunk_size=chunk_size))
+
+    require_pyarrow()
+    if output_format == 'parquet':
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).metadata.num_rows
+
+    import pyarrow as pa
+    with pa.memory_map(path) as source:
+        reader = pa.ipc.open_file(source)
+        return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+
+
+def read_schema(path: str, sample_rows: int = 10000) -> Dict[str, str]:
+    """Column names and pandas dtypes of a table, sniffed from the first rows of a CSV."""
+    output_format = detect_format(path)
+    if output_format == 'csv':
+        sample = pd.read_csv(path, nrows=sample_rows)
+        return {col: str(dtype) for col, dtype in sample.dtypes.items()}
+
+    require_pyarrow()
+    if output_format == 'parquet':
+        import pyarrow.parquet as pq
+        schema = pq.read_schema(path)
+    else:
+        import pyarrow as pa
+        with pa.memory_map(path) as source:
+            schema = pa.ipc.open_file(source).schema
+    empty = schema.empty_table().to_pandas(date_as_object=False)
+    return {col: str(dtype) for col, dtype in empty.dtypes.items()}
+
+
+def memory_footprint(df: pd.DataFrame) -> int:
+    """Bytes held by a DataFrame, including string contents."""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def optimize_dtypes(df: pd.DataFrame, category_ratio: float = CATEGORY_RATIO) -> pd.DataFrame:
+    """Shrink a DataFrame in place: low-cardinality strings become categoricals and
+    integer columns are downcast to the smallest integer type that holds them.
+
+    Floats are left as float64 so sums and means are unchanged.
+    """
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(series):
+            continue
+        if pd.api.types.is_integer_dtype(series):
+            df[col] = pd.to_numeric(series, downcast='integer')
+        elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            if series.nunique() <= max(1, len(series) * category_ratio):
+                df[col] = series.astype('category')
+    return df
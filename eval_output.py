@@ -0,0 +1,192 @@
+"""
+Serialization of eval datasets.
+
+Every case is encoded exactly once; the combined file, the per-category files and
+the index are assembled from those bytes. The pretty json format uses the stdlib
+encoder, so its files are byte-identical to json.dump(indent=2). The compact formats
+use orjson when installed, which writes non-ASCII characters as raw UTF-8 instead of
+\\u escapes, floats like 1e20 without a '+', and NaN as null.
+
+Formats:
+- json:          pretty combined file plus one file per category (the original layout)
+- json-compact:  the same files without whitespace
+- jsonl:         one case per line in eval_dataset_all.jsonl, grouped by category
+- jsonl.zst:     the same, each category compressed as an independent zstd frame
+
+Every format also writes eval_dataset_index.json with the metadata and, per category,
+its description, case count and location: a file, or a byte range of the JSONL file
+(of the compressed file for jsonl.zst), so one category can be read without the rest.
+"""
+
+import json
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # plain json is slower but produces equivalent documents
+    orjson = None
+
+
+EVAL_FORMATS = ['json', 'json-compact', 'jsonl', 'jsonl.zst']
+INDEX_FILE = "eval_dataset_index.json"
+COMBINED_STEM = "eval_dataset_all"
+
+
+def _require_zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("zstandard is required for jsonl.zst eval output: pip install zstandard")
+    return zstandard
+
+
+def _encoder(pretty: bool) -> Callable[[Any], bytes]:
+    # Pretty output keeps the stdlib encoding, so existing json files diff and hash the same
+    if pretty:
+        return lambda obj: json.dumps(obj, indent=2).encode('utf-8')
+    if orjson is not None:
+        return lambda obj: orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return lambda obj: json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+
+def _indent(encoded: bytes, depth: int) -> bytes:
+    # Newlines inside JSON strings are escaped, so every raw newline is layout
+    return encoded.replace(b'\n', b'\n' + b' ' * depth)
+
+
+def _json_array(items: List[bytes], depth: int, pretty: bool) -> bytes:
+    if not items:
+        return b'[]'
+    if not pretty:
+        return b'[' + b','.join(items) + b']'
+    inner = b' ' * (depth + 2)
+    body = b',\n'.join(inner + _indent(item, depth + 2) for item in items)
+    return b'[\n' + body + b'\n' + b' ' * depth + b']'
+
+
+def _json_object(fields: List[Tuple[str, bytes]], depth: int, pretty: bool, encode: Callable[[Any], bytes]) -> bytes:
+    """Object from already-encoded values; values must be encoded at depth 0."""
+    if not pretty:
+        return b'{' + b','.join(encode(key) + b':' + value for key, value in fields) + b'}'
+    inner = b' ' * (depth + 2)
+    body = b',\n'.join(inner + encode(key) + b': ' + _indent(value, depth + 2) for key, value in fields)
+    return b'{\n' + body + b'\n' + b' ' * depth + b'}'
+
+
+def write_evals(
+    output_dir: str,
+    metadata: Dict[str, Any],
+    categories: List[Tuple[str, str, str, List[Dict[str, Any]]]],
+    output_format: str = 'json'
+) -> Dict[str, str]:
+    """Write eval cases in one of EVAL_FORMATS.
+
+    Args:
+        output_dir: Directory for the files
+        metadata: Dataset-level metadata
+        categories: (category, file key, description, cases) per category, e.g.
+            ("data_aggregation", "aggregation", "...", [...]); a file key of None keeps
+            the category in the combined file only
+        output_format: One of EVAL_FORMATS
+
+    Returns:
+        Written files: 'combined', 'index' and, for json formats, one per file key
+    """
+    if output_format not in EVAL_FORMATS:
+        raise ValueError(f"Unknown eval format '{output_format}', expected one of {EVAL_FORMATS}")
+
+    output_dir = Path(output_dir)
+    metadata = dict(metadata, format=output_format)
+    pretty = output_format == 'json'
+    encode = _encoder(pretty)
+    encode_key = _encoder(False)
+
+    # The only serialization of each case
+    encoded = {category: [encode(case) for case in cases] for category, _, _, cases in categories}
+    index = {"metadata": metadata, "categories": {}}
+    output_files = {}
+
+    if output_format in ('json', 'json-compact'):
+        encoded_metadata = encode(metadata)
+        combined_categories = []
+        for category, file_key, description, cases in categories:
+            combined_categories.append((category, _json_object([
+                ("description", encode(description)),
+                ("count", encode(len(cases))),
+                ("cases", _json_array(encoded[category], 0, pretty))
+            ], 0, pretty, encode_key)))
+
+            if file_key is None:
+                index["categories"][category] = {"description": description, "count": len(cases)}
+                continue
+            path = output_dir / f"eval_dataset_{file_key}.json"
+            path.write_bytes(_json_object([
+                ("metadata", encoded_metadata),
+                ("cases", _json_array(encoded[category], 0, pretty))
+            ], 0, pretty, encode_key))
+            output_files[file_key] = str(path)
+            index["categories"][category] = {"description": description, "count": len(cases), "file": path.name}
+
+        combined_path = output_dir / f"{COMBINED_STEM}.json"
+        combined_path.write_bytes(_json_object([
+            ("metadata", encoded_metadata),
+            ("categories", _json_object(combined_categories, 0, pretty, encode_key))
+        ], 0, pretty, encode_key))
+    else:
+        compressor = _require_zstandard().ZstdCompressor(level=3) if output_format == 'jsonl.zst' else None
+        combined_path = output_dir / f"{COMBINED_STEM}.{output_format}"
+        offset = 0
+        with open(combined_path, 'wb') as f:
+            for category, file_key, description, cases in categories:
+                block = b''.join(line + b'\n' for line in encoded[category])
+                if compressor is not None:
+                    block = compressor.compress(block)
+                f.write(block)
+                index["categories"][category] = {
+                    "description": description,
+                    "count": len(cases),
+                    "file": combined_path.name,
+                    "offset": offset,
+                    "length": len(block)
+                }
+                offset += len(block)
+
+    output_files = {'combined': str(combined_path), **output_files}
+    index_path = output_dir / INDEX_FILE
+    index_path.write_bytes(_encoder(True)(index))
+    output_files['index'] = str(index_path)
+    return output_files
+
+
+def read_eval_index(output_dir: str) -> Dict[str, Any]:
+    """Metadata and per-category counts, descriptions and locations, without reading any cases."""
+    with open(Path(output_dir) / INDEX_FILE, 'rb') as f:
+        return json.loads(f.read())
+
+
+def read_eval_cases(output_dir: str, category: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Cases of one category (e.g. "data_aggregation"), or of all categories, in any format."""
+    output_dir = Path(output_dir)
+    index = read_eval_index(output_dir)
+    output_format = index["metadata"].get("format", "json")
+    loads = orjson.loads if orjson is not None else json.loads
+
+    names = [category] if category else list(index["categories"])
+    cases = []
+    for name in names:
+        entry = index["categories"][name]
+        if "file" not in entry:
+            continue
+        if output_format in ('json', 'json-compact'):
+            with open(output_dir / entry["file"], 'rb') as f:
+                cases.extend(loads(f.read())["cases"])
+            continue
+
+        with open(output_dir / entry["file"], 'rb') as f:
+            f.seek(entry["offset"])
+            block = f.read(entry["length"])
+        if output_format == 'jsonl.zst':
+            block = _require_zstandard().ZstdDecompressor().decompress(block)
+        cases.extend(loads(line) for line in block.splitlines() if line)
+    return cases
@@ -0,0 +1,99 @@
+"""
+Plans for eval generation: every category's case specs, and the work they share.
+
+Cases are not answered one at a time. EvalDatasetGenerator.plan_evals first samples
+the specs of every requested category, and records what each needs here, grouped by
+shared work: one grouping per distinct set of group columns (serving aggregation,
+multi-group and grouped custom metric cases alike), one derived column per custom
+metric (metrics with the same null/zero filter share its mask), daily sums per group
+column for grouped time comparisons, and the metrics that need exact medians.
+execute_plan then runs each grouping as a single groupby over the data (out-of-core:
+all of them in a single pass), and build_evals turns the answers into cases.
+"""
+
+from typing import Any, Dict, Set, Tuple
+
+
+def _plural(count: int, noun: str, plural: str = None) -> str:
+    return f"{count} {noun if count == 1 else plural or noun + 's'}"
+
+
+class EvalPlan:
+    """Case specs of every planned category plus the shared work that answers them."""
+
+    def __init__(self):
+        # Category -> that category's specs, as sampled by the planner
+        self.specs: Dict[str, Any] = {}
+        # Group columns -> numeric columns and custom metric names to aggregate by them
+        self.groupings: Dict[Tuple[str, ...], Dict[str, Set[str]]] = {}
+        # Group column -> numeric columns to sum by (Date, group), for grouped time comparisons
+        self.daily_groupings: Dict[str, Set[str]] = {}
+        # Custom metric name -> definition, for metrics evaluated into derived columns
+        self.metrics: Dict[str, Dict[str, Any]] = {}
+        self.medians: Set[str] = set()
+        # Cases answered by each grouping / daily grouping
+        self.cases: Dict[tuple, int] = {}
+        # Passes over the data, while planning (date index) and executing
+        self.scans = 0
+
+    def add_grouping(self, group_cols, columns=(), metrics=(), cases: int = 0):
+        entry = self.groupings.setdefault(tuple(group_cols), {'columns': set(), 'metrics': set()})
+        entry['columns'].update(columns)
+        entry['metrics'].update(metrics)
+        key = ('group', tuple(group_cols))
+        self.cases[key] = self.cases.get(key, 0) + cases
+
+    def add_daily_grouping(self, group_col: str, column: str, cases: int = 1):
+        self.daily_groupings.setdefault(group_col, set()).add(column)
+        key = ('daily', group_col)
+        self.cases[key] = self.cases.get(key, 0) + cases
+
+    def add_metric(self, metric: Dict[str, Any], median: bool = False):
+        self.metrics[metric['name']] = metric
+        if median:
+            self.medians.add(metric['name'])
+
+    @property
+    def filters(self) -> Set[tuple]:
+        """Distinct row filters (columns that must be non-null, zero guard) of the planned metrics."""
+        return {(tuple(sorted(metric['columns'])), metric.get('zero_guard')) for metric in self.metrics.values()}
+
+    @property
+    def operations(self) -> int:
+        """Vectorized operations the plan runs: one per grouping, plus metric evaluation and medians."""
+        return len(self.groupings) + len(self.daily_groupings) + bool(self.metrics) + bool(self.medians)
+
+    def case_count(self) -> int:
+        return sum(len(specs) for category_specs in self.specs.values() for specs in category_specs)
+
+    def describe(self) -> str:
+        lines = [f"🗺️  Eval plan: {_plural(self.case_count(), 'case spec')} from {_plural(len(self.specs), 'category', 'categories')}"
+                 f" -> {_plural(self.operations, 'operation')}"]
+        for group_cols, entry in self.groupings.items():
+            columns = [f"{len(entry['columns'])} numeric"] if entry['columns'] else []
+            if entry['metrics']:
+                columns.append(f"{len(entry['metrics'])} custom metric")
+            lines.append(f"   - group by {', '.join(group_cols)}: {' + '.join(columns)} "
+                         f"({_plural(self.cases.get(('group', group_cols), 0), 'case')})")
+        for group_col, columns in self.daily_groupings.items():
+            lines.append(f"   - daily sums by {group_col}: {len(columns)} numeric "
+                         f"({_plural(self.cases.get(('daily', group_col), 0), 'case')})")
+        if self.metrics:
+            lines.append(f"   - {_plural(len(self.metrics), 'custom metric')} evaluated once, "
+                         f"sharing {_plural(len(self.filters), 'row filter')}")
+        if self.medians:
+            lines.append(f"   - exact medians of {_plural(len(self.medians), 'custom metric')}")
+        return '\n'.join(lines)
+
+    def summary(self) -> Dict[str, Any]:
+        """JSON-friendly counts of the plan, for reports."""
+        return {
+            "cases": self.case_count(),
+            "operations": self.operations,
+            "groupings": [list(group_cols) for group_cols in self.groupings],
+            "daily_groupings": sorted(self.daily_groupings),
+            "custom_metrics": sorted(self.metrics),
+            "row_filters": len(self.filters),
+            "medians": sorted(self.medians),
+            "scans": self.scans
+        }
@@ -1,40 +1,328 @@
+import numpy as np
 import pandas as pd
 import json
 import argparse
-from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from datetime import datetime
+from typing import List, Dict, Any, Iterator, Optional, Tuple, Union
+import itertools
+import os
 import random
+import re
+import shutil
+import tempfile
+from chunked_aggregates import GroupedAggregates, exact_medians
+from eval_output import EVAL_FORMATS, write_evals
+from eval_plan import EvalPlan
+from data_io import iter_table, memory_footprint, optimize_dtypes, read_schema, read_table, require_pyarrow
+from process_pool import process_pool
+from telemetry import Telemetry
+
+
+EVAL_CATEGORIES = ['aggregation', 'time_comparison', 'custom_metrics']
+CATEGORY_LABELS = {'aggregation': 'data aggregation', 'time_comparison': 'time comparison', 'custom_metrics': 'custom metrics'}
+
+# Aggregations precomputed for every (categorical column, numeric column) pair
+CUBE_AGGREGATIONS = ['sum', 'count', 'min', 'max', 'mean']
+
+# Built-in custom metrics. "formula" is a pandas.eval expression over the "columns";
+# rows with nulls in those columns or a zero in the "zero_guard" column are skipped.
+CUSTOM_METRICS = [
+    {
+        "name": "ROI",
+        "formula": "(Total Revenue - Total Cost) / Total Cost * 100",
+        "columns": ["Total Revenue", "Total Cost"],
+        "description": "Return on Investment percentage",
+        "zero_guard": "Total Cost"
+    },
+    {
+        "name": "Conversion Rate",
+        "formula": "Conversions / Clicks * 100",
+        "columns": ["Conversions", "Clicks"],
+        "description": "Conversion rate percentage",
+        "zero_guard": "Clicks"
+    },
+    {
+        "name": "Cost Per Conversion",
+        "formula": "Total Cost / Conversions",
+        "columns": ["Total Cost", "Conversions"],
+        "description": "Average cost per conversion",
+        "zero_guard": "Conversions"
+    },
+    {
+        "name": "Revenue Per Session",
+        "formula": "Total Revenue / Sessions",
+        "columns": ["Total Revenue", "Sessions"],
+        "description": "Average revenue per session",
+        "zero_guard": "Sessions"
+    },
+    {
+        "name": "Profit Margin",
+        "formula": "(Total Revenue - Total Cost) / Total Revenue * 100",
+        "columns": ["Total Revenue", "Total Cost"],
+        "description": "Profit margin percentage",
+        "zero_guard": "Total Revenue"
+    }
+]
+
+METRIC_KEYS = ['name', 'formula', 'columns']
+
+# Aggregation function -> (label, question wording)
+AGG_FUNCTIONS = {
+    'sum': ('sum', 'total'),
+    'mean': ('average', 'avg'),
+    'min': ('minimum', 'min'),
+    'max': ('maximum', 'max'),
+    'count': ('count', 'number of')
+}
+CUSTOM_AGG_DESCRIPTIONS = {'mean': "average", 'sum': "total", 'median': "median"}
+
+
+def _is_categorical(series: pd.Series) -> bool:
+    return (isinstance(series.dtype, pd.CategoricalDtype)
+            or pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series))
+
+
+def _dtype_kind(dtype: str) -> str:
+    """'numeric', 'text' or 'other' for a pandas dtype name from a schema."""
+    dtype = pd.api.types.pandas_dtype(dtype) if dtype != 'category' else pd.CategoricalDtype()
+    if pd.api.types.is_bool_dtype(dtype):
+        return 'other'
+    if pd.api.types.is_numeric_dtype(dtype):
+        return 'numeric'
+    if dtype == object or pd.api.types.is_string_dtype(dtype) or isinstance(dtype, pd.CategoricalDtype):
+        return 'text'
+    return 'other'
+
+
+def load_custom_metrics(path: str) -> List[Dict[str, Any]]:
+    """Load custom metric definitions from a JSON or YAML file.
+
+    The file holds a list of metrics (or {"metrics": [...]}), each with a name,
+    formula and columns, and optionally a zero_guard column and a description.
+    """
+    with open(path, 'r') as f:
+        if path.endswith(('.yaml', '.yml')):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError("PyYAML is required for YAML metric files: pip install pyyaml")
+            metrics = yaml.safe_load(f)
+        else:
+            metrics = json.load(f)
+    
+    if isinstance(metrics, dict):
+        metrics = metrics.get('metrics', [])
+    if not isinstance(metrics, list):
+        raise ValueError(f"{path}: expected a list of metric definitions")
+    
+    for metric in metrics:
+        missing = [key for key in METRIC_KEYS if key not in metric]
+        if missing:
+            raise ValueError(f"{path}: metric {metric.get('name', '?')!r} is missing {missing}")
+        if metric.get('zero_guard') and metric['zero_guard'] not in metric['columns']:
+            raise ValueError(f"{path}: zero_guard of metric {metric['name']!r} must be one of its columns")
+        metric.setdefault('zero_guard', None)
+        metric.setdefault('description', metric['name'])
+    return metrics
+
+
+def _derived_column(metric_name: str) -> str:
+    """Column name of a custom metric's derived values, kept apart from the data columns."""
+    return f"metric: {metric_name}"
+
+
+def _metric_expression(metric: Dict[str, Any]) -> str:
+    """pandas.eval form of a metric formula, with column names backtick-quoted."""
+    columns = sorted(metric['columns'], key=len, reverse=True)
+    pattern = '|'.join(re.escape(col) for col in columns)
+    return re.sub(rf'(?<![\w`])({pattern})(?![\w`])', lambda m: f"`{m.group(1)}`", metric['formula'])
 
 
 class EvalDatasetGenerator:
-    def __init__(self, data_csv_path: str):
-        """Initialize with the synthetic data CSV."""
-        self.df = pd.read_csv(data_csv_path)
-        self.df['Date'] = pd.to_datetime(self.df['Date'])
-        self.numeric_columns = self.df.select_dtypes(include=['float64', 'int64']).columns.tolist()
-        self.categorical_columns = self.df.select_dtypes(include=['object']).columns.tolist()
-        if 'Date' in self.categorical_columns:
-            self.categorical_columns.remove('Date')
+    def __init__(
+        self,
+        data_csv_path: Union[str, pd.DataFrame],
+        columns: Optional[List[str]] = None,
+        custom_metrics: Optional[List[Dict[str, Any]]] = None,
+        categories: Optional[List[str]] = None,
+        schema: Optional[Dict[str, str]] = None,
+        optimize_memory: bool = True,
+        chunk_size: Optional[int] = None,
+        telemetry: Optional[Telemetry] = None
+    ):
+        """Initialize with the synthetic data file (CSV, Parquet or Arrow), or the data itself.
+
+        Args:
+            data_csv_path: Path to the synthetic data, or an already loaded DataFrame (used
+                without re-reading; only the needed columns are kept, and the caller's
+                frame is not modified)
+            columns: Only load these columns ('Date' is always loaded for time comparisons);
+                by default only the columns the requested categories need are loaded
+            custom_metrics: Extra metric definitions (see load_custom_metrics); a
+                metric with a built-in name replaces the built-in one
+            categories: Eval categories to generate (default: all of EVAL_CATEGORIES)
+            schema: Column -> pandas dtype, e.g. {"Country": "category"}; sniffed from the file if omitted
+            optimize_memory: Convert low-cardinality strings to categoricals and downcast integers
+            chunk_size: Out-of-core mode: never load the whole file, but answer every case from
+                mergeable aggregates built over chunks of this many rows (one pass for every
+                planned case, plus one for the date index); medians are exact, found by
+                histogram narrowing over a few more passes
+            telemetry: Records time, CPU, peak RSS and rows/sec of loading and of each
+                eval phase (optional)
+        """
+        self.categories = list(categories or EVAL_CATEGORIES)
+        unknown = [category for category in self.categories if category not in EVAL_CATEGORIES]
+        if unknown:
+            raise ValueError(f"Unknown eval categories {unknown}, expected some of {EVAL_CATEGORIES}")
+        
+        registry = {metric['name']: metric for metric in CUSTOM_METRICS}
+        registry.update({metric['name']: metric for metric in custom_metrics or []})
+        self.custom_metrics = list(registry.values())
+        
+        data = None
+        if isinstance(data_csv_path, pd.DataFrame):
+            if chunk_size:
+                raise ValueError("Out-of-core mode (chunk_size) needs a file path, not a DataFrame")
+            data, data_csv_path = data_csv_path, None
+            file_schema = {col: str(dtype) for col, dtype in data.dtypes.items()}
+        else:
+            file_schema = read_schema(data_csv_path)
+        file_schema.update(schema or {})
+        if columns is None:
+            columns = self._required_columns(file_schema)
+        if 'time_comparison' in self.categories and 'Date' not in columns:
+            columns = ['Date'] + list(columns)
+        # Dates are parsed below; explicit dtypes for the rest are applied while reading
+        dtype = {col: dtype for col, dtype in (schema or {}).items()
+                 if col in columns and col != 'Date' and not dtype.startswith('datetime')}
+        
+        self.chunk_size = chunk_size
+        self.telemetry = telemetry or Telemetry(enabled=False)
+        self.scans = 0
+        self._schema = schema
+        # Spec sampling RNG; generate_all_evals swaps in a seeded one per category
+        self._rng = random
+        self._path = data_csv_path
+        self._dtype = dtype
+        # Computed results keyed by (group columns, metric, aggregation)
+        self._result_cache: Dict[tuple, Any] = {}
+        # Aggregate cube: group column -> DataFrame indexed by group, columns (metric, aggregation)
+        self._cube: Dict[str, pd.DataFrame] = {}
+        # Date index: rows' dates in sorted order, prefix sums per numeric column
+        self._sorted_dates: Optional[np.ndarray] = None
+        # First and last date as reported by worker processes (out-of-core, workers > 1)
+        self._worker_date_range: Optional[tuple] = None
+        self._prefix_sums: Dict[str, np.ndarray] = {}
+        # Per group column, sums by (Date, group) for grouped time comparisons
+        self._daily_group_sums: Dict[str, pd.DataFrame] = {}
+        # Last plan run by generate_evals
+        self.plan: Optional[EvalPlan] = None
+        # Metadata and per-category counts of the last generate_all_evals run
+        self.eval_index: Optional[Dict[str, Any]] = None
+        
+        if chunk_size:
+            self.df = None
+            self.row_count = None
+            self.memory_report = None
+            self.numeric_columns = [col for col in columns if col != 'Date' and _dtype_kind(file_schema[col]) == 'numeric']
+            self.categorical_columns = [col for col in columns if col != 'Date' and _dtype_kind(file_schema[col]) == 'text']
+            return
         
+        if data is not None:
+            # A projection of the caller's frame; changes below replace columns, never write into it
+            self.df = data[columns]
+            if dtype:
+                self.df = self.df.astype(dtype)
+        else:
+            with self.telemetry.step('load') as counters:
+                self.df = read_table(data_csv_path, columns=columns, dtype=dtype or None)
+                counters['rows'] = len(self.df)
+        self.row_count = len(self.df)
+        memory_before = memory_footprint(self.df)
+        if 'Date' in self.df.columns and not pd.api.types.is_datetime64_any_dtype(self.df['Date']):
+            with self.telemetry.step('parse_dates', rows=self.row_count):
+                self.df['Date'] = pd.to_datetime(self.df['Date'])
+        if optimize_memory:
+            with self.telemetry.step('optimize_dtypes', rows=self.row_count):
+                optimize_dtypes(self.df)
+        self.memory_report = {'before_bytes': memory_before, 'after_bytes': memory_footprint(self.df)}
+        
+        self.numeric_columns = [col for col in self.df.select_dtypes(include='number').columns if col != 'Date']
+        self.categorical_columns = [col for col in self.df.columns if col != 'Date' and _is_categorical(self.df[col])]
+        
+    def _required_columns(self, schema: Dict[str, str]) -> List[str]:
+        """Columns the requested eval categories read, in file order."""
+        needed = set()
+        for col, dtype in schema.items():
+            kind = _dtype_kind(dtype)
+            if col == 'Date':
+                if 'time_comparison' in self.categories:
+                    needed.add(col)
+            elif kind == 'text':
+                # Every category groups by the categorical columns
+                needed.add(col)
+            elif kind == 'numeric' and ('aggregation' in self.categories or 'time_comparison' in self.categories):
+                needed.add(col)
+        
+        if 'custom_metrics' in self.categories:
+            needed.update(col for metric in self.custom_metrics for col in metric['columns'] if col in schema)
+        return [col for col in schema if col in needed]
+    
+    def date_range(self) -> Optional[tuple]:
+        """First and last Date as YYYY-MM-DD strings, if known without another pass over the data."""
+        if self.df is not None and 'Date' in self.df.columns:
+            dates = self.df['Date'].dropna().to_numpy(dtype='datetime64[ns]')
+        else:
+            dates = self._sorted_dates
+        if dates is None:
+            return self._worker_date_range
+        if len(dates) == 0:
+            return None
+        return pd.Timestamp(dates.min()).strftime('%Y-%m-%d'), pd.Timestamp(dates.max()).strftime('%Y-%m-%d')
+    
+    def _scan(self, columns: List[str]) -> Iterator[pd.DataFrame]:
+        """One pass over the file in chunks (out-of-core mode), with Date parsed."""
+        columns = list(dict.fromkeys(columns))
+        dtype = {col: dtype for col, dtype in self._dtype.items() if col in columns}
+        rows = 0
+        for chunk in iter_table(self._path, columns=columns, chunk_size=self.chunk_size, dtype=dtype or None):
+            if 'Date' in chunk.columns and not pd.api.types.is_datetime64_any_dtype(chunk['Date']):
+                chunk['Date'] = pd.to_datetime(chunk['Date'])
+            rows += len(chunk)
+            yield chunk
+        self.row_count = rows
+        self.scans += 1
+    
     def generate_aggregation_evals(self, num_cases: int = 20) -> List[Dict[str, Any]]:
         """Generate eval cases for data aggregation with group by."""
-        eval_cases = []
+        return self.generate_evals({'aggregation': num_cases})['aggregation']
+    
+    def _plan_aggregation(self, plan: EvalPlan, num_cases: int):
+        """Sample aggregation specs; single-column groupings form the aggregate cube."""
+        group_candidates = [col for col in self.categorical_columns if col != 'Date']
+        specs = self._sample_specs(
+            list(itertools.product(group_candidates, self.numeric_columns, AGG_FUNCTIONS)),
+            num_cases, "aggregation"
+        )
+        multi_specs = self._sample_specs(
+            list(itertools.product(itertools.combinations(group_candidates, 2), self.numeric_columns, ['sum', 'mean', 'count'])),
+            5, "multi-group aggregation"
+        )
         
-        agg_functions = {
-            'sum': ('sum', 'total'),
-            'mean': ('average', 'avg'),
-            'min': ('minimum', 'min'),
-            'max': ('maximum', 'max'),
-            'count': ('count', 'number of')
-        }
+        for group_col in self.categorical_columns:
+            plan.add_grouping((group_col,), self.numeric_columns, cases=sum(spec[0] == group_col for spec in specs))
+        for group_pair, metric_col, _ in multi_specs:
+            plan.add_grouping(group_pair, [metric_col], cases=1)
+        plan.specs['aggregation'] = (specs, multi_specs)
+    
+    def _aggregation_cases(self, specs: tuple) -> List[Dict[str, Any]]:
+        eval_cases = []
+        specs, multi_specs = specs
         
-        for i in range(num_cases):
-            group_col = random.choice([col for col in self.categorical_columns if col != 'Date'])
-            metric_col = random.choice(self.numeric_columns)
-            agg_func = random.choice(list(agg_functions.keys()))
-            agg_label, agg_desc = agg_functions[agg_func]
+        for i, (group_col, metric_col, agg_func) in enumerate(specs):
+            agg_label, agg_desc = AGG_FUNCTIONS[agg_func]
             
-            result = self.df.groupby(group_col)[metric_col].agg(agg_func).to_dict()
+            result = self._grouped_result((group_col,), metric_col, agg_func).to_dict()
             
             question = f"What is the {agg_desc} of {metric_col} by {group_col}?"
             
@@ -53,13 +341,11 @@ class EvalDatasetGenerator:
             }
             eval_cases.append(eval_case)
         
-        for i in range(5):
-            group_cols = random.sample([col for col in self.categorical_columns if col != 'Date'], 2)
-            metric_col = random.choice(self.numeric_columns)
-            agg_func = random.choice(['sum', 'mean', 'count'])
-            agg_label, agg_desc = agg_functions[agg_func]
+        for i, (group_pair, metric_col, agg_func) in enumerate(multi_specs):
+            group_cols = list(group_pair)
+            agg_label, agg_desc = AGG_FUNCTIONS[agg_func]
             
-            result = self.df.groupby(group_cols)[metric_col].agg(agg_func)
+            result = self._grouped_result(group_pair, metric_col, agg_func)
             result_dict = {}
             for idx, val in result.items():
                 key = f"{idx[0]}_{idx[1]}"
@@ -84,46 +370,71 @@ class EvalDatasetGenerator:
         return eval_cases
     
     def generate_time_comparison_evals(self, num_cases: int = 15) -> List[Dict[str, Any]]:
-        """Generate eval cases for metric comparison between time periods."""
-        eval_cases = []
+        """Generate eval cases for metric comparison between time periods.
+
+        Windows are the midpoint split of the date range plus consecutive calendar
+        weeks, months and quarters, sampled round-robin across window types.
+        """
+        return self.generate_evals({'time_comparison': num_cases})['time_comparison']
+    
+    def _plan_time_comparison(self, plan: EvalPlan, num_cases: int):
+        """Sample comparison windows; needs the date index, which is built here."""
+        plan.specs['time_comparison'] = ([], [])
         
-        self.df = self.df.sort_values('Date')
-        date_range = (self.df['Date'].max() - self.df['Date'].min()).days
+        self._build_date_index()
+        dates = self._sorted_dates
+        if len(dates) == 0:
+            print("Warning: No valid dates. Skipping time comparison evals.")
+            return
+        
+        date_range = int((dates[-1] - dates[0]) // np.timedelta64(1, 'D'))
         
         if date_range < 30:
             print("Warning: Date range is less than 30 days. Time comparison evals may be limited.")
         
-        for i in range(num_cases):
-            metric_col = random.choice(self.numeric_columns)
-            
-            split_point = self.df['Date'].min() + timedelta(days=date_range // 2)
-            
-            period1_df = self.df[self.df['Date'] < split_point]
-            period2_df = self.df[self.df['Date'] >= split_point]
-            
-            period1_value = period1_df[metric_col].sum()
-            period2_value = period2_df[metric_col].sum()
+        windows = self._comparison_windows()
+        specs = self._sample_windows(windows, self.numeric_columns, num_cases)
+        
+        group_candidates = [col for col in self.categorical_columns if col != 'Date']
+        grouped_specs = self._sample_windows(
+            windows, list(itertools.product(self.numeric_columns, group_candidates)), 5
+        )
+        
+        for _, _, _, (metric_col, group_col) in grouped_specs:
+            plan.add_daily_grouping(group_col, metric_col)
+        plan.specs['time_comparison'] = (specs, grouped_specs)
+    
+    def _time_comparison_cases(self, specs: tuple) -> List[Dict[str, Any]]:
+        eval_cases = []
+        specs, grouped_specs = specs
+        
+        for window, period1, period2, metric_col in specs:
+            period1_value = self._period_sum(metric_col, *period1)
+            period2_value = self._period_sum(metric_col, *period2)
             difference = period2_value - period1_value
             percent_change = ((period2_value - period1_value) / period1_value * 100) if period1_value != 0 else None
             
-            period1_str = f"{period1_df['Date'].min().strftime('%Y-%m-%d')} to {period1_df['Date'].max().strftime('%Y-%m-%d')}"
-            period2_str = f"{period2_df['Date'].min().strftime('%Y-%m-%d')} to {period2_df['Date'].max().strftime('%Y-%m-%d')}"
+            period1_start, period1_end = self._period_bounds(*period1)
+            period2_start, period2_end = self._period_bounds(*period2)
+            period1_str = f"{period1_start} to {period1_end}"
+            period2_str = f"{period2_start} to {period2_end}"
             
             question = f"Compare the total {metric_col} between {period1_str} and {period2_str}. What is the difference?"
             
             eval_case = {
-                "id": f"time_comp_{i+1}",
+                "id": f"time_comp_{len(eval_cases)+1}",
                 "category": "time_period_comparison",
                 "question": question,
                 "metric_column": metric_col,
+                "window": window,
                 "time_period_1": {
-                    "start": period1_df['Date'].min().strftime('%Y-%m-%d'),
-                    "end": period1_df['Date'].max().strftime('%Y-%m-%d'),
+                    "start": period1_start,
+                    "end": period1_end,
                     "value": float(period1_value) if pd.notna(period1_value) else None
                 },
                 "time_period_2": {
-                    "start": period2_df['Date'].min().strftime('%Y-%m-%d'),
-                    "end": period2_df['Date'].max().strftime('%Y-%m-%d'),
+                    "start": period2_start,
+                    "end": period2_end,
                     "value": float(period2_value) if pd.notna(period2_value) else None
                 },
                 "expected_result": {
@@ -136,19 +447,11 @@ class EvalDatasetGenerator:
             }
             eval_cases.append(eval_case)
         
-        for i in range(5):
-            metric_col = random.choice(self.numeric_columns)
-            group_col = random.choice([col for col in self.categorical_columns if col != 'Date'])
-            
-            split_point = self.df['Date'].min() + timedelta(days=date_range // 2)
+        for i, (window, period1, period2, (metric_col, group_col)) in enumerate(grouped_specs):
+            period1_grouped = self._period_group_sums(metric_col, group_col, *period1)
+            period2_grouped = self._period_group_sums(metric_col, group_col, *period2)
             
-            period1_df = self.df[self.df['Date'] < split_point]
-            period2_df = self.df[self.df['Date'] >= split_point]
-            
-            period1_grouped = period1_df.groupby(group_col)[metric_col].sum().to_dict()
-            period2_grouped = period2_df.groupby(group_col)[metric_col].sum().to_dict()
-            
-            all_groups = set(list(period1_grouped.keys()) + list(period2_grouped.keys()))
+            all_groups = list(period1_grouped) + [g for g in period2_grouped if g not in period1_grouped]
             comparison_result = {}
             for group in all_groups:
                 val1 = period1_grouped.get(group, 0)
@@ -162,8 +465,8 @@ class EvalDatasetGenerator:
                     "percent_change": float(round(pct_change, 2)) if pct_change is not None and pd.notna(pct_change) else None
                 }
             
-            period1_str = f"{period1_df['Date'].min().strftime('%Y-%m-%d')} to {period1_df['Date'].max().strftime('%Y-%m-%d')}"
-            period2_str = f"{period2_df['Date'].min().strftime('%Y-%m-%d')} to {period2_df['Date'].max().strftime('%Y-%m-%d')}"
+            period1_str = "{} to {}".format(*self._period_bounds(*period1))
+            period2_str = "{} to {}".format(*self._period_bounds(*period2))
             
             question = f"Compare the total {metric_col} by {group_col} between {period1_str} and {period2_str}."
             
@@ -173,6 +476,7 @@ class EvalDatasetGenerator:
                 "question": question,
                 "metric_column": metric_col,
                 "group_by_column": group_col,
+                "window": window,
                 "time_period_1": period1_str,
                 "time_period_2": period2_str,
                 "expected_result": comparison_result,
@@ -182,87 +486,163 @@ class EvalDatasetGenerator:
         
         return eval_cases
     
+    def _build_date_index(self):
+        """Sort rows by Date once and keep per-column prefix sums, so any period sum is two searchsorted lookups."""
+        if self._sorted_dates is not None:
+            return
+        
+        if self.df is None:
+            # Out-of-core: the same index over daily totals
+            state = GroupedAggregates(['Date'], self.numeric_columns)
+            for chunk in self._scan(['Date'] + self.numeric_columns):
+                state.update(chunk)
+            daily = state.result()
+            self._sorted_dates = daily.index.to_numpy(dtype='datetime64[ns]')
+            for col in self.numeric_columns:
+                sums = daily[(col, 'sum')].to_numpy()
+                dtype = np.int64 if pd.api.types.is_integer_dtype(sums.dtype) else np.float64
+                self._prefix_sums[col] = np.concatenate([[0], np.cumsum(sums, dtype=dtype)])
+            return
+        
+        dates = self.df['Date'].to_numpy(dtype='datetime64[ns]')
+        valid = ~np.isnat(dates)
+        positions = np.flatnonzero(valid)
+        order = positions[np.argsort(dates[valid], kind='stable')]
+        self.scans += 1
+        
+        self._sorted_dates = dates[order]
+        self._prefix_sums = {}
+        for col in self.numeric_columns:
+            values = self.df[col].to_numpy()[order]
+            if pd.api.types.is_integer_dtype(values.dtype):
+                sums = np.cumsum(values, dtype=np.int64)
+            else:
+                sums = np.cumsum(np.nan_to_num(values.astype(np.float64)))
+            self._prefix_sums[col] = np.concatenate([[0], sums])
+    
+    def _period_slice(self, start: np.datetime64, end: np.datetime64) -> tuple:
+        """Positions [i, j) of the sorted rows (or days, out-of-core) with start <= Date < end."""
+        return (
+            int(np.searchsorted(self._sorted_dates, start, side='left')),
+            int(np.searchsorted(self._sorted_dates, end, side='left'))
+        )
+    
+    def _period_rows(self, start: np.datetime64, end: np.datetime64) -> int:
+        i, j = self._period_slice(start, end)
+        return j - i
+    
+    def _period_sum(self, metric_col: str, start: np.datetime64, end: np.datetime64):
+        i, j = self._period_slice(start, end)
+        sums = self._prefix_sums[metric_col]
+        return sums[j] - sums[i]
+    
+    def _period_bounds(self, start: np.datetime64, end: np.datetime64) -> tuple:
+        """First and last date present in [start, end), as YYYY-MM-DD strings."""
+        i, j = self._period_slice(start, end)
+        return (
+            pd.Timestamp(self._sorted_dates[i]).strftime('%Y-%m-%d'),
+            pd.Timestamp(self._sorted_dates[j - 1]).strftime('%Y-%m-%d')
+        )
+    
+    def _period_group_sums(self, metric_col: str, group_col: str, start: np.datetime64, end: np.datetime64) -> Dict[Any, Any]:
+        """Per-group sums of metric_col over [start, end), for groups with rows in the period.
+
+        Answered from the planned daily sums by (Date, group), one row per day and group.
+        """
+        daily = self._daily_group_sums[group_col]
+        dates = daily.index.get_level_values(0)
+        period = daily[(dates >= start) & (dates < end)]
+        rows = period[('', 'rows')].groupby(level=1, observed=True).sum()
+        sums = period[(metric_col, 'sum')].groupby(level=1, observed=True).sum()
+        return {group: sums[group] for group in rows.index[rows > 0]}
+    
+    def _comparison_windows(self) -> Dict[str, List[tuple]]:
+        """Candidate (period 1, period 2) pairs of [start, end) bounds, by window type."""
+        dates = self._sorted_dates
+        first = dates[0].astype('datetime64[D]')
+        last = dates[-1].astype('datetime64[D]') + np.timedelta64(1, 'D')
+        
+        windows = {}
+        split_point = first + np.timedelta64(int((last - first) // np.timedelta64(1, 'D') - 1) // 2, 'D')
+        windows['midpoint'] = [((first, split_point), (split_point, last))]
+        
+        for window, freq in [('week_over_week', 'W'), ('month_over_month', 'M'), ('quarter_over_quarter', 'Q')]:
+            periods = pd.period_range(pd.Timestamp(first), pd.Timestamp(last), freq=freq)
+            bounds = [
+                (p.start_time.to_datetime64().astype('datetime64[D]'), (p + 1).start_time.to_datetime64().astype('datetime64[D]'))
+                for p in periods
+            ]
+            # Only calendar periods fully inside the data range
+            bounds = [(start, end) for start, end in bounds if start >= first and end <= last]
+            windows[window] = list(zip(bounds[:-1], bounds[1:]))
+        
+        # Both periods need at least one row
+        for window, pairs in windows.items():
+            windows[window] = [pair for pair in pairs if all(self._period_rows(*period) > 0 for period in pair)]
+        return windows
+    
+    def _sample_windows(self, windows: Dict[str, List[tuple]], subjects: list, num_cases: int) -> List[tuple]:
+        """Distinct (window, period 1, period 2, subject) specs, round-robin across window types."""
+        pools = {
+            window: self._rng.sample(
+                [(window, p1, p2, subject) for (p1, p2), subject in itertools.product(pairs, subjects)],
+                len(pairs) * len(subjects)
+            )
+            for window, pairs in windows.items()
+        }
+        
+        specs = []
+        while len(specs) < num_cases and any(pools.values()):
+            for window in pools:
+                if pools[window] and len(specs) < num_cases:
+                    specs.append(pools[window].pop())
+        
+        if len(specs) < num_cases:
+            print(f"⚠️  Only {len(specs)} distinct time comparison cases available ({num_cases} requested)")
+        return specs
+    
     def generate_custom_metrics_evals(self, num_cases: int = 15) -> List[Dict[str, Any]]:
         """Generate eval cases for custom metrics and their aggregation."""
-        eval_cases = []
+        return self.generate_evals({'custom_metrics': num_cases})['custom_metrics']
+    
+    def _plan_custom_metrics(self, plan: EvalPlan, num_cases: int):
+        """Sample custom metric specs; each metric becomes one derived column, grouped means share groupings."""
+        available = set(self.numeric_columns) | set(self.categorical_columns)
+        if self.df is not None:
+            available |= set(self.df.columns)
+        metrics = [metric for metric in self.custom_metrics
+                   if all(col in available for col in metric["columns"])]
+        specs = self._sample_specs(
+            list(itertools.product(metrics, CUSTOM_AGG_DESCRIPTIONS)), num_cases, "custom metric"
+        )
         
-        custom_metrics = [
-            {
-                "name": "ROI",
-                "formula": "(Total Revenue - Total Cost) / Total Cost * 100",
-                "columns": ["Total Revenue", "Total Cost"],
-                "description": "Return on Investment percentage"
-            },
-            {
-                "name": "Conversion Rate",
-                "formula": "Conversions / Clicks * 100",
-                "columns": ["Conversions", "Clicks"],
-                "description": "Conversion rate percentage"
-            },
-            {
-                "name": "Cost Per Conversion",
-                "formula": "Total Cost / Conversions",
-                "columns": ["Total Cost", "Conversions"],
-                "description": "Average cost per conversion"
-            },
-            {
-                "name": "Revenue Per Session",
-                "formula": "Total Revenue / Sessions",
-                "columns": ["Total Revenue", "Sessions"],
-                "description": "Average revenue per session"
-            },
-            {
-                "name": "Profit Margin",
-                "formula": "(Total Revenue - Total Cost) / Total Revenue * 100",
-                "columns": ["Total Revenue", "Total Cost"],
-                "description": "Profit margin percentage"
-            }
-        ]
+        group_candidates = [col for col in self.categorical_columns if col != 'Date']
+        grouped_specs = self._sample_specs(
+            list(itertools.product(metrics, group_candidates)), 5, "grouped custom metric"
+        )
         
-        for i in range(num_cases):
-            metric = random.choice(custom_metrics)
-            
+        for metric, agg_func in specs:
+            plan.add_metric(metric, median=agg_func == 'median')
+        for metric, group_col in grouped_specs:
+            plan.add_metric(metric)
+            plan.add_grouping((group_col,), metrics=[metric["name"]], cases=1)
+        plan.specs['custom_metrics'] = (specs, grouped_specs)
+    
+    def _custom_metrics_cases(self, specs: tuple) -> List[Dict[str, Any]]:
+        eval_cases = []
+        specs, grouped_specs = specs
+        
+        for metric, agg_func in specs:
             required_cols = metric["columns"]
-            if not all(col in self.df.columns for col in required_cols):
-                continue
-            
-            df_clean = self.df.dropna(subset=required_cols)
-            
-            if metric["name"] == "ROI":
-                df_clean = df_clean[df_clean["Total Cost"] != 0]
-                df_clean['custom_metric'] = (df_clean["Total Revenue"] - df_clean["Total Cost"]) / df_clean["Total Cost"] * 100
-            elif metric["name"] == "Conversion Rate":
-                df_clean = df_clean[df_clean["Clicks"] != 0]
-                df_clean['custom_metric'] = df_clean["Conversions"] / df_clean["Clicks"] * 100
-            elif metric["name"] == "Cost Per Conversion":
-                df_clean = df_clean[df_clean["Conversions"] != 0]
-                df_clean['custom_metric'] = df_clean["Total Cost"] / df_clean["Conversions"]
-            elif metric["name"] == "Revenue Per Session":
-                df_clean = df_clean[df_clean["Sessions"] != 0]
-                df_clean['custom_metric'] = df_clean["Total Revenue"] / df_clean["Sessions"]
-            elif metric["name"] == "Profit Margin":
-                df_clean = df_clean[df_clean["Total Revenue"] != 0]
-                df_clean['custom_metric'] = (df_clean["Total Revenue"] - df_clean["Total Cost"]) / df_clean["Total Revenue"] * 100
-            
-            if len(df_clean) == 0:
+            result = self._custom_metric_result(metric, agg_func)
+            if result is None:
                 continue
-            
-            agg_func = random.choice(['mean', 'sum', 'median'])
-            
-            if agg_func == 'mean':
-                result = df_clean['custom_metric'].mean()
-                agg_desc = "average"
-            elif agg_func == 'sum':
-                result = df_clean['custom_metric'].sum()
-                agg_desc = "total"
-            else:
-                result = df_clean['custom_metric'].median()
-                agg_desc = "median"
+            agg_desc = CUSTOM_AGG_DESCRIPTIONS[agg_func]
             
             question = f"Calculate the {agg_desc} {metric['name']} across all records. Formula: {metric['formula']}"
             
             eval_case = {
-                "id": f"custom_metric_{i+1}",
+                "id": f"custom_metric_{len(eval_cases)+1}",
                 "category": "custom_metrics",
                 "question": question,
                 "metric_name": metric["name"],
@@ -275,41 +655,19 @@ class EvalDatasetGenerator:
             }
             eval_cases.append(eval_case)
         
-        for i in range(5):
-            metric = random.choice(custom_metrics)
-            group_col = random.choice([col for col in self.categorical_columns if col != 'Date'])
-            
+        grouped_count = 0
+        for metric, group_col in grouped_specs:
             required_cols = metric["columns"]
-            if not all(col in self.df.columns for col in required_cols):
+            result = self._custom_metric_result(metric, 'mean', group_col)
+            if result is None:
                 continue
-            
-            df_clean = self.df.dropna(subset=required_cols)
-            
-            if metric["name"] == "ROI":
-                df_clean = df_clean[df_clean["Total Cost"] != 0]
-                df_clean['custom_metric'] = (df_clean["Total Revenue"] - df_clean["Total Cost"]) / df_clean["Total Cost"] * 100
-            elif metric["name"] == "Conversion Rate":
-                df_clean = df_clean[df_clean["Clicks"] != 0]
-                df_clean['custom_metric'] = df_clean["Conversions"] / df_clean["Clicks"] * 100
-            elif metric["name"] == "Cost Per Conversion":
-                df_clean = df_clean[df_clean["Conversions"] != 0]
-                df_clean['custom_metric'] = df_clean["Total Cost"] / df_clean["Conversions"]
-            elif metric["name"] == "Revenue Per Session":
-                df_clean = df_clean[df_clean["Sessions"] != 0]
-                df_clean['custom_metric'] = df_clean["Total Revenue"] / df_clean["Sessions"]
-            elif metric["name"] == "Profit Margin":
-                df_clean = df_clean[df_clean["Total Revenue"] != 0]
-                df_clean['custom_metric'] = (df_clean["Total Revenue"] - df_clean["Total Cost"]) / df_clean["Total Revenue"] * 100
-            
-            if len(df_clean) == 0:
-                continue
-            
-            result = df_clean.groupby(group_col)['custom_metric'].mean().to_dict()
+            result = result.to_dict()
+            grouped_count += 1
             
             question = f"Calculate the average {metric['name']} by {group_col}. Formula: {metric['formula']}"
             
             eval_case = {
-                "id": f"custom_metric_grouped_{i+1}",
+                "id": f"custom_metric_grouped_{grouped_count}",
                 "category": "custom_metrics_grouped",
                 "question": question,
                 "metric_name": metric["name"],
@@ -325,90 +683,503 @@ class EvalDatasetGenerator:
         
         return eval_cases
     
-    def generate_all_evals(self, output_dir: str = ".") -> Dict[str, str]:
-        """Generate all eval datasets and save them."""
-        print("🔄 Generating evaluation datasets...")
-        
-        agg_evals = self.generate_aggregation_evals()
-        print(f"✅ Generated {len(agg_evals)} data aggregation eval cases")
-        
-        time_evals = self.generate_time_comparison_evals()
-        print(f"✅ Generated {len(time_evals)} time comparison eval cases")
-        
-        custom_evals = self.generate_custom_metrics_evals()
-        print(f"✅ Generated {len(custom_evals)} custom metrics eval cases")
-        
-        all_evals = {
-            "metadata": {
-                "generated_at": datetime.now().isoformat(),
-                "source_data": "synthetic marketing data",
-                "total_cases": len(agg_evals) + len(time_evals) + len(custom_evals)
-            },
-            "categories": {
-                "data_aggregation": {
-                    "description": "Test cases for grouping and aggregating data with sum, avg, min, max",
-                    "count": len(agg_evals),
-                    "cases": agg_evals
-                },
-                "time_period_comparison": {
-                    "description": "Test cases for comparing metrics between different time periods",
-                    "count": len(time_evals),
-                    "cases": time_evals
-                },
-                "custom_metrics": {
-                    "description": "Test cases for calculating and aggregating custom business metrics",
-                    "count": len(custom_evals),
-                    "cases": custom_evals
+    def _sample_specs(self, space: list, num_cases: int, label: str) -> list:
+        """Draw up to num_cases distinct specs from an enumerated spec space, without replacement."""
+        if num_cases > len(space):
+            print(f"⚠️  Only {len(space)} distinct {label} cases available ({num_cases} requested)")
+        return self._rng.sample(space, min(num_cases, len(space)))
+    
+    def build_aggregate_cube(self) -> Dict[str, pd.DataFrame]:
+        """Precompute sum/count/min/max/mean of every numeric column, grouped by each categorical column.
+
+        Runs as a plan of its own, so out-of-core all group columns share a single pass.
+        """
+        missing = [col for col in self.categorical_columns if col not in self._cube]
+        if missing:
+            plan = EvalPlan()
+            for group_col in missing:
+                plan.add_grouping((group_col,), self.numeric_columns)
+            self.execute_plan(plan)
+        return self._cube
+    
+    def _cube_for(self, group_col: str) -> pd.DataFrame:
+        if group_col not in self._cube:
+            self.build_aggregate_cube()
+        return self._cube[group_col]
+    
+    def save_aggregate_cube(self, path: str):
+        """Persist the aggregate cube as JSON: {group column: {metric: {aggregation: {group: value}}}}."""
+        cube = {}
+        for group_col, table in self.build_aggregate_cube().items():
+            cube[group_col] = {
+                metric_col: {
+                    agg_func: {str(k): float(v) if pd.notna(v) else None for k, v in table[(metric_col, agg_func)].items()}
+                    for agg_func in CUBE_AGGREGATIONS
                 }
+                for metric_col in self.numeric_columns
             }
+        
+        with open(path, 'w') as f:
+            json.dump({
+                "metadata": {
+                    "generated_at": datetime.now().isoformat(),
+                    "rows": self.row_count,
+                    "aggregations": CUBE_AGGREGATIONS
+                },
+                "cube": cube
+            }, f)
+    
+    def _grouped_result(self, group_cols: tuple, metric_col: str, agg_func: str) -> pd.Series:
+        """Groupby aggregation, answered from the aggregate cube for single-column groups.
+
+        Other results come from execute_plan (or, in memory, are computed and memoized),
+        keyed by (group columns, metric, aggregation).
+        """
+        if len(group_cols) == 1 and agg_func in CUBE_AGGREGATIONS and metric_col in self.numeric_columns:
+            return self._cube_for(group_cols[0])[(metric_col, agg_func)]
+        
+        key = (tuple(group_cols), metric_col, agg_func)
+        if key not in self._result_cache:
+            by = list(group_cols) if len(group_cols) > 1 else group_cols[0]
+            self._result_cache[key] = self.df.groupby(by, observed=True)[metric_col].agg(agg_func)
+        return self._result_cache[key]
+    
+    @staticmethod
+    def _evaluate_metrics(metrics: Dict[str, Dict[str, Any]], frame: pd.DataFrame, failed: set) -> pd.DataFrame:
+        """Derived columns (see _derived_column) of custom metrics over frame.
+
+        A metric is NaN on rows with nulls in its columns or a zero in its zero_guard
+        column; metrics with the same filter share its mask and upcast inputs. Metrics
+        that fail to evaluate are added to `failed`, reported once and left all-NaN.
+        """
+        derived = pd.DataFrame(np.nan, index=frame.index, columns=[_derived_column(name) for name in metrics])
+        inputs = {}
+        for name, metric in metrics.items():
+            if name in failed:
+                continue
+            row_filter = (tuple(sorted(metric["columns"])), metric.get("zero_guard"))
+            try:
+                if row_filter not in inputs:
+                    columns, zero_guard = row_filter
+                    mask = frame[list(columns)].notna().all(axis=1)
+                    if zero_guard:
+                        mask &= frame[zero_guard] != 0
+                    subset = frame.loc[mask, list(columns)]
+                    # Downcast integers would overflow in expressions like Conversions * 100
+                    inputs[row_filter] = subset.astype(
+                        {col: 'int64' for col in subset.columns if pd.api.types.is_integer_dtype(subset[col])}
+                    )
+                derived[_derived_column(name)] = inputs[row_filter].eval(_metric_expression(metric))
+            except Exception as e:
+                print(f"⚠️  Skipping metric {name!r}: cannot evaluate {metric['formula']!r} ({e})")
+                failed.add(name)
+        return derived
+    
+    def _custom_metric_result(self, metric: Dict[str, Any], agg_func: str, group_col: Optional[str] = None):
+        """Aggregated custom metric, overall or per group, as answered by execute_plan; None if no row qualifies."""
+        if not self._result_cache.get(('custom_rows', metric["name"])):
+            return None
+        return self._result_cache[((group_col,) if group_col else (), metric["name"], agg_func)]
+    
+    def plan_evals(self, num_cases: Dict[str, int], seeds: Optional[Dict[str, Optional[int]]] = None) -> EvalPlan:
+        """Phase 1: sample the case specs of every category and record the work they need.
+
+        Args:
+            num_cases: Cases per category, e.g. {'aggregation': 20, 'custom_metrics': 15}
+            seeds: Sampling seed per category (optional); each category draws from its own
+                RNG, so its specs do not depend on which other categories are planned
+        """
+        planners = {
+            'aggregation': self._plan_aggregation,
+            'time_comparison': self._plan_time_comparison,
+            'custom_metrics': self._plan_custom_metrics
         }
+        plan = EvalPlan()
+        scans = self.scans
+        for category in EVAL_CATEGORIES:
+            if category not in num_cases:
+                continue
+            seed = (seeds or {}).get(category)
+            self._rng = random.Random(seed) if seed is not None else random
+            planners[category](plan, num_cases[category])
+        plan.scans = self.scans - scans
+        return plan
+    
+    def execute_plan(self, plan: EvalPlan):
+        """Phase 2: answer every grouping and custom metric of a plan, sharing passes over the data.
+
+        Custom metrics are evaluated once into derived columns, then each grouping runs as
+        a single groupby over its numeric and derived columns together. In memory that is
+        one pass over the loaded table; out-of-core, every grouping is updated from the same
+        chunks of one scan, and exact medians take a few more. Answers already computed by
+        an earlier plan are not recomputed.
+        """
+        scans = self.scans
         
-        output_files = {}
+        groupings = {}
+        for group_cols, entry in plan.groupings.items():
+            if len(group_cols) == 1 and group_cols[0] in self._cube:
+                columns = []
+            else:
+                columns = sorted(col for col in entry['columns'] if (group_cols, col, 'sum') not in self._result_cache)
+            names = sorted(name for name in entry['metrics'] if (group_cols, name, 'mean') not in self._result_cache)
+            if columns or names:
+                groupings[group_cols] = (columns, names)
         
-        combined_path = f"{output_dir}/eval_dataset_all.json"
-        with open(combined_path, 'w') as f:
-            json.dump(all_evals, f, indent=2)
-        output_files['combined'] = combined_path
-        print(f"📄 Saved combined eval dataset: {combined_path}")
+        daily = {}
+        for group_col, columns in plan.daily_groupings.items():
+            known = self._daily_group_sums.get(group_col)
+            if known is not None:
+                if all((col, 'sum') in known.columns for col in columns):
+                    continue
+                columns = columns | {col for col, stat in known.columns if stat == 'sum'}
+            daily[group_col] = sorted(columns)
         
-        agg_path = f"{output_dir}/eval_dataset_aggregation.json"
-        with open(agg_path, 'w') as f:
-            json.dump({"metadata": all_evals["metadata"], "cases": agg_evals}, f, indent=2)
-        output_files['aggregation'] = agg_path
-        print(f"📄 Saved aggregation eval dataset: {agg_path}")
+        overall = sorted(
+            name for name in plan.metrics
+            if ('custom_rows', name) not in self._result_cache
+            or (name in plan.medians and ((), name, 'median') not in self._result_cache)
+        )
+        metrics = {name: plan.metrics[name] for name in sorted(set(overall).union(*(names for _, names in groupings.values())))}
         
-        time_path = f"{output_dir}/eval_dataset_time_comparison.json"
-        with open(time_path, 'w') as f:
-            json.dump({"metadata": all_evals["metadata"], "cases": time_evals}, f, indent=2)
-        output_files['time_comparison'] = time_path
-        print(f"📄 Saved time comparison eval dataset: {time_path}")
+        if not (groupings or daily or metrics):
+            return
         
-        custom_path = f"{output_dir}/eval_dataset_custom_metrics.json"
-        with open(custom_path, 'w') as f:
-            json.dump({"metadata": all_evals["metadata"], "cases": custom_evals}, f, indent=2)
-        output_files['custom_metrics'] = custom_path
-        print(f"📄 Saved custom metrics eval dataset: {custom_path}")
+        states = {
+            ('group', group_cols): GroupedAggregates(list(group_cols), columns + [_derived_column(name) for name in names])
+            for group_cols, (columns, names) in groupings.items()
+        }
+        for group_col, columns in daily.items():
+            states[('daily', group_col)] = GroupedAggregates(['Date', group_col], columns)
+        if overall:
+            states[('overall', ())] = GroupedAggregates([], [_derived_column(name) for name in overall])
+        
+        failed = set()
+        metric_columns = [col for metric in metrics.values() for col in metric["columns"]]
+        if self.df is None:
+            columns = (['Date'] if daily else []) + [col for group_cols in groupings for col in group_cols] + list(daily) \
+                + [col for columns, _ in groupings.values() for col in columns] \
+                + [col for columns in daily.values() for col in columns] + metric_columns
+            chunks = self._scan(columns)
+        else:
+            chunks = [self.df]
+            self.scans += 1
+        
+        derived = None
+        for chunk in chunks:
+            derived = self._evaluate_metrics(metrics, chunk, failed)
+            frame = pd.concat([chunk, derived], axis=1) if metrics else chunk
+            for state in states.values():
+                state.update(frame)
+        
+        for group_cols, (columns, names) in groupings.items():
+            result = states[('group', group_cols)].result()
+            if len(group_cols) == 1 and columns and set(self.numeric_columns) <= set(columns):
+                self._cube[group_cols[0]] = result[self.numeric_columns]
+            else:
+                for col in columns:
+                    for agg_func in CUBE_AGGREGATIONS:
+                        self._result_cache[(group_cols, col, agg_func)] = result[(col, agg_func)]
+            for name in names:
+                # Only groups with rows that qualify for the metric
+                column = _derived_column(name)
+                self._result_cache[(group_cols, name, 'mean')] = result.loc[result[(column, 'count')] > 0, (column, 'mean')]
+        
+        for group_col in daily:
+            self._daily_group_sums[group_col] = states[('daily', group_col)].result()
+        
+        if overall:
+            totals = states[('overall', ())].result()
+            stats = {}
+            for name in overall:
+                column = _derived_column(name)
+                count = int(totals[(column, 'count')].iloc[0]) if len(totals) else 0
+                self._result_cache[('custom_rows', name)] = count
+                if count:
+                    self._result_cache[((), name, 'sum')] = totals[(column, 'sum')].iloc[0]
+                    self._result_cache[((), name, 'mean')] = totals[(column, 'mean')].iloc[0]
+                    stats[name] = (count, totals[(column, 'min')].iloc[0], totals[(column, 'max')].iloc[0])
+            
+            median_names = sorted(plan.medians & set(stats))
+            if median_names and self.df is not None:
+                for name in median_names:
+                    self._result_cache[((), name, 'median')] = derived[_derived_column(name)].median()
+            elif median_names:
+                median_metrics = {name: metrics[name] for name in median_names}
+                
+                def scan_values():
+                    for chunk in self._scan([col for metric in median_metrics.values() for col in metric["columns"]]):
+                        values = self._evaluate_metrics(median_metrics, chunk, failed)
+                        yield {name: values[_derived_column(name)].dropna().to_numpy(dtype=np.float64) for name in median_names}
+                
+                medians = exact_medians(scan_values, {name: stats[name] for name in median_names})
+                for name, median in medians.items():
+                    self._result_cache[((), name, 'median')] = median
+        
+        plan.scans += self.scans - scans
+    
+    def build_evals(self, plan: EvalPlan) -> Dict[str, List[Dict[str, Any]]]:
+        """Phase 3: turn the answered specs of each planned category into eval cases."""
+        builders = {
+            'aggregation': self._aggregation_cases,
+            'time_comparison': self._time_comparison_cases,
+            'custom_metrics': self._custom_metrics_cases
+        }
+        return {category: builders[category](specs) for category, specs in plan.specs.items()}
+    
+    def generate_evals(
+        self,
+        num_cases: Dict[str, int],
+        seeds: Optional[Dict[str, Optional[int]]] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Plan, execute and build the cases of several categories together, e.g. {'aggregation': 20}.
+
+        The executed plan is kept in self.plan.
+        """
+        with self.telemetry.step('plan'):
+            self.plan = self.plan_evals(num_cases, seeds)
+        print(self.plan.describe())
+        with self.telemetry.step('execute') as counters:
+            self.execute_plan(self.plan)
+            # Out-of-core, the row count is known once the data has been scanned
+            counters['rows'] = self.row_count
+        print(f"🔍 Passes over the data: {self.plan.scans}")
+        self.telemetry.info['eval_plan'] = self.plan.summary()
+        with self.telemetry.step('build'):
+            return self.build_evals(self.plan)
+    
+    def _generate_categories(
+        self,
+        num_cases: Dict[str, int],
+        seeds: Dict[str, Optional[int]],
+        output_dir: str
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Generate categories from one shared plan (and, for aggregation, save the aggregate cube)."""
+        results = self.generate_evals(num_cases, seeds)
+        for category, cases in results.items():
+            print(f"✅ Generated {len(cases)} {CATEGORY_LABELS[category]} eval cases")
+        
+        if 'aggregation' in results:
+            print(f"🧊 Built aggregate cube over {len(self._cube)} group columns")
+            cube_path = f"{output_dir}/eval_aggregate_cube.json"
+            with self.telemetry.step('save_cube'):
+                self.save_aggregate_cube(cube_path)
+            print(f"📄 Saved aggregate cube: {cube_path}")
+        
+        return results
+    
+    def _generate_parallel(
+        self,
+        categories: List[str],
+        num_cases: Dict[str, int],
+        seeds: Dict[str, Optional[int]],
+        output_dir: str,
+        workers: int
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Generate categories in worker processes; results come back in category order.
+
+        In memory, the loaded table is written once, uncompressed, to an Arrow file
+        (in /dev/shm when available) that every worker memory-maps, reading only its
+        category's columns. Out-of-core, workers scan the source file themselves.
+        """
+        options = {'custom_metrics': self.custom_metrics, 'chunk_size': self.chunk_size, 'schema': self._schema}
+        shared_dir = None
+        try:
+            if self.df is None:
+                path = self._path
+            else:
+                require_pyarrow("sharing the eval table with worker processes")
+                import pyarrow.feather as feather
+                shared_dir = tempfile.mkdtemp(prefix='evals_', dir='/dev/shm' if os.path.isdir('/dev/shm') else None)
+                path = os.path.join(shared_dir, 'table.arrow')
+                feather.write_feather(self.df, path, compression='uncompressed')
+                options['schema'] = None
+            
+            print(f"⚡ Generating {len(categories)} categories in {min(workers, len(categories))} worker processes")
+            with process_pool(min(workers, len(categories))) as executor:
+                futures = {
+                    category: executor.submit(
+                        _generate_category_in_worker, path, options, category,
+                        num_cases[category], seeds[category], output_dir
+                    )
+                    for category in categories
+                }
+                results = {}
+                for category in categories:
+                    results[category], date_range, row_count = futures[category].result()
+                    # Out-of-core, only the workers have seen the data
+                    self._worker_date_range = self._worker_date_range or date_range
+                    if self.row_count is None:
+                        self.row_count = row_count
+                return results
+        finally:
+            if shared_dir is not None:
+                shutil.rmtree(shared_dir, ignore_errors=True)
+    
+    def generate_all_evals(
+        self,
+        output_dir: str = ".",
+        agg_cases: int = 20,
+        time_cases: int = 15,
+        custom_cases: int = 15,
+        seed: Optional[int] = None,
+        workers: int = 1,
+        output_format: str = 'json'
+    ) -> Dict[str, str]:
+        """Generate all eval datasets and save them.
+
+        Args:
+            output_dir: Directory for the eval files
+            agg_cases / time_cases / custom_cases: Cases per category
+            seed: Root seed; each category samples from its own derived seed, so output
+                is identical for any number of workers (optional)
+            workers: Generate categories in parallel worker processes, which read the
+                data from a shared memory-mapped Arrow file (default: 1); with one worker
+                all categories are answered from a single shared plan
+            output_format: One of EVAL_FORMATS: json (default), json-compact, jsonl or jsonl.zst
+        """
+        if output_format not in EVAL_FORMATS:
+            raise ValueError(f"Unknown eval format '{output_format}', expected one of {EVAL_FORMATS}")
+        print("🔄 Generating evaluation datasets...")
+        os.makedirs(output_dir, exist_ok=True)
+        
+        num_cases = {'aggregation': agg_cases, 'time_comparison': time_cases, 'custom_metrics': custom_cases}
+        seeds = _category_seeds(seed)
+        categories = [category for category in EVAL_CATEGORIES if category in self.categories]
+        
+        if workers > 1 and len(categories) > 1:
+            # Steps inside the workers are not recorded; their CPU time counts toward this one
+            with self.telemetry.step('generate_parallel', rows=self.row_count):
+                results = self._generate_parallel(categories, num_cases, seeds, output_dir, workers)
+        else:
+            results = self._generate_categories({category: num_cases[category] for category in categories}, seeds, output_dir)
+        
+        agg_evals = results.get('aggregation', [])
+        time_evals = results.get('time_comparison', [])
+        custom_evals = results.get('custom_metrics', [])
+        
+        metadata = {
+            "generated_at": datetime.now().isoformat(),
+            "source_data": "synthetic marketing data",
+            "total_cases": len(agg_evals) + len(time_evals) + len(custom_evals)
+        }
+        date_range = self.date_range()
+        if date_range:
+            metadata["date_range"] = {"start": date_range[0], "end": date_range[1]}
+        blocks = [
+            ("data_aggregation", 'aggregation',
+             "Test cases for grouping and aggregating data with sum, avg, min, max", agg_evals),
+            ("time_period_comparison", 'time_comparison',
+             "Test cases for comparing metrics between different time periods", time_evals),
+            ("custom_metrics", 'custom_metrics',
+             "Test cases for calculating and aggregating custom business metrics", custom_evals)
+        ]
+        # Unrequested categories stay (empty) in the combined file but get no file of their own
+        blocks = [(name, key if key in self.categories else None, description, cases)
+                  for name, key, description, cases in blocks]
+        
+        with self.telemetry.step('write'):
+            output_files = write_evals(output_dir, metadata, blocks, output_format)
+        # In-memory copy of the index, so callers need not read it back
+        self.eval_index = {
+            "metadata": dict(metadata, format=output_format),
+            "categories": {name: {"description": description, "count": len(cases)} for name, _, description, cases in blocks}
+        }
+        print(f"📄 Saved combined eval dataset ({output_format}): {output_files['combined']}")
+        for category in EVAL_CATEGORIES:
+            if category in output_files:
+                print(f"📄 Saved {category.replace('_', ' ')} eval dataset: {output_files[category]}")
+        print(f"🗂️  Saved eval index: {output_files['index']}")
+        
+        if 'aggregation' in self.categories:
+            output_files['cube'] = f"{output_dir}/eval_aggregate_cube.json"
         
         return output_files
 
 
+def _category_seeds(seed: Optional[int]) -> Dict[str, Optional[int]]:
+    """Derive an independent seed per eval category from a single root seed."""
+    if seed is None:
+        return {category: None for category in EVAL_CATEGORIES}
+    children = np.random.SeedSequence(seed).spawn(len(EVAL_CATEGORIES))
+    return {category: int(child.generate_state(1)[0]) for category, child in zip(EVAL_CATEGORIES, children)}
+
+
+def _generate_category_in_worker(
+    path: str,
+    options: Dict[str, Any],
+    category: str,
+    num_cases: int,
+    seed: Optional[int],
+    output_dir: str
+) -> Tuple[List[Dict[str, Any]], Optional[tuple], Optional[int]]:
+    """One category's cases, plus the date range and row count the worker saw."""
+    generator = EvalDatasetGenerator(path, categories=[category], **options)
+    cases = generator._generate_categories({category: num_cases}, {category: seed}, output_dir)[category]
+    return cases, generator.date_range(), generator.row_count
+
+
 def main():
     parser = argparse.ArgumentParser(description='Generate evaluation datasets for AI agent testing')
-    parser.add_argument('data_csv', help='Path to synthetic data CSV file')
+    parser.add_argument('data_csv', help='Path to synthetic data file (CSV, Parquet or Arrow)')
     parser.add_argument('--output-dir', '-o', default='.', help='Output directory for eval files')
     parser.add_argument('--agg-cases', type=int, default=20, help='Number of aggregation eval cases')
     parser.add_argument('--time-cases', type=int, default=15, help='Number of time comparison eval cases')
     parser.add_argument('--custom-cases', type=int, default=15, help='Number of custom metrics eval cases')
+    parser.add_argument('--custom-metrics', help='JSON or YAML file of extra custom metric definitions')
+    parser.add_argument('--categories', nargs='+', choices=EVAL_CATEGORIES, help='Eval categories to generate (default: all); only their columns are loaded')
+    parser.add_argument('--schema', help='JSON file mapping columns to pandas dtypes (default: sniffed from the data)')
+    parser.add_argument('--chunk-size', type=int, help='Out-of-core mode: never load the whole file, aggregate it in chunks of this many rows')
+    parser.add_argument('--workers', '-w', type=int, default=1, help='Generate eval categories in parallel worker processes (default: 1)')
+    parser.add_argument('--seed', type=int, help='Random seed; the same seed gives identical evals for any worker count (optional)')
+    parser.add_argument('--eval-format', choices=EVAL_FORMATS, default='json', help='Eval output format (default: json)')
+    parser.add_argument('--explain', action='store_true', help='Print the eval plan (case specs grouped into shared operations) without running it')
     
     args = parser.parse_args()
     
     print(f"📊 Loading data from: {args.data_csv}")
-    generator = EvalDatasetGenerator(args.data_csv)
+    custom_metrics = load_custom_metrics(args.custom_metrics) if args.custom_metrics else None
+    schema = None
+    if args.schema:
+        with open(args.schema, 'r') as f:
+            schema = json.load(f)
+    generator = EvalDatasetGenerator(
+        args.data_csv,
+        custom_metrics=custom_metrics,
+        categories=args.categories,
+        schema=schema,
+        chunk_size=args.chunk_size
+    )
+    
+    if generator.df is None:
+        print(f"🧱 Out-of-core mode: aggregating in chunks of {args.chunk_size} rows")
+    else:
+        print(f"📈 Dataset info: {len(generator.df)} rows, {len(generator.df.columns)} columns")
+        report = generator.memory_report
+        print(f"💾 Memory: {report['before_bytes'] / 1e6:.2f} MB loaded -> {report['after_bytes'] / 1e6:.2f} MB optimized "
+              f"({report['before_bytes'] / max(1, report['after_bytes']):.1f}x smaller)")
+        if 'Date' in generator.df.columns:
+            print(f"📅 Date range: {generator.df['Date'].min()} to {generator.df['Date'].max()}")
     
-    print(f"📈 Dataset info: {len(generator.df)} rows, {len(generator.df.columns)} columns")
-    print(f"📅 Date range: {generator.df['Date'].min()} to {generator.df['Date'].max()}")
+    if args.explain:
+        num_cases = {'aggregation': args.agg_cases, 'time_comparison': args.time_cases, 'custom_metrics': args.custom_cases}
+        plan = generator.plan_evals(
+            {category: num_cases[category] for category in generator.categories},
+            _category_seeds(args.seed)
+        )
+        print(plan.describe())
+        print(f"🔍 Passes over the data while planning: {plan.scans}")
+        return
     
-    output_files = generator.generate_all_evals(output_dir=args.output_dir)
+    output_files = generator.generate_all_evals(
+        output_dir=args.output_dir,
+        agg_cases=args.agg_cases,
+        time_cases=args.time_cases,
+        custom_cases=args.custom_cases,
+        seed=args.seed,
+        workers=args.workers,
+        output_format=args.eval_format
+    )
     
     print(f"\n✅ Successfully generated evaluation datasets!")
     print(f"📁 Output files:")
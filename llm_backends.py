@@ -0,0 +1,270 @@
+"""
+Pluggable backends for Gemini calls.
+
+- live:   call the Gemini API
+- record: call the Gemini API and append every request/response pair to a cassette
+- replay: serve responses from a cassette locally, with optional synthetic latency
+- stub:   run a local HTTP server that speaks the generateContent API and point
+          the real genai client at it, serving responses from a cassette
+
+Usage (standalone stub server):
+    python3 llm_backends.py serve --cassette .cache/gemini_cassette.jsonl --port 8765
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from google import genai
+from google.genai import types
+
+
+LLM_MODES = ['live', 'record', 'replay', 'stub']
+DEFAULT_CASSETTE = ".cache/gemini_cassette.jsonl"
+
+
+def prompt_key(model: str, prompt: str) -> str:
+    """Cassette lookup key for a model/prompt pair."""
+    return hashlib.sha256(f"{model}\n{prompt}".encode('utf-8')).hexdigest()
+
+
+class ReplayResponse:
+    """Minimal stand-in for a GenerateContentResponse."""
+
+    def __init__(self, text: Optional[str]):
+        self.text = text
+
+
+class GeminiBackend:
+    """Calls the Gemini API (or any server speaking it, via base_url)."""
+
+    def __init__(self, api_key: str, base_url: Optional[str] = None):
+        http_options = types.HttpOptions(base_url=base_url) if base_url else None
+        self.client = genai.Client(api_key=api_key, http_options=http_options)
+
+    def generate_content(self, model: str, contents: str, config=None):
+        return self.client.models.generate_content(model=model, contents=contents, config=config)
+
+    def list_models(self) -> List[str]:
+        return [model.name for model in self.client.models.list()]
+
+
+class RecordingBackend:
+    """Delegates to another backend and appends each exchange to a JSONL cassette."""
+
+    def __init__(self, inner, cassette_path: str = DEFAULT_CASSETTE):
+        self.inner = inner
+        self.cassette_path = Path(cassette_path)
+        self.cassette_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def generate_content(self, model: str, contents: str, config=None):
+        start = time.perf_counter()
+        try:
+            response = self.inner.generate_content(model=model, contents=contents, config=config)
+        except Exception as e:
+            self._append(model, contents, None, str(e), time.perf_counter() - start)
+            raise
+
+        self._append(model, contents, response.text, None, time.perf_counter() - start)
+        return response
+
+    def _append(self, model: str, prompt: str, text: Optional[str], error: Optional[str], latency: float):
+        entry = {
+            'key': prompt_key(model, prompt),
+            'model': model,
+            'prompt': prompt,
+            'response_text': text,
+            'error': error,
+            'latency': round(latency, 3)
+        }
+        with self._lock:
+            with open(self.cassette_path, 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+
+    def list_models(self) -> List[str]:
+        return self.inner.list_models()
+
+
+class ReplayBackend:
+    """Serves recorded responses from a cassette without any network access.
+
+    Repeated requests for the same model and prompt step through the recorded
+    exchanges in order (the last one repeats), so recorded failures and retries
+    replay faithfully. Unrecorded requests fail like an unavailable model.
+    """
+
+    def __init__(self, cassette_path: str = DEFAULT_CASSETTE, latency: float = 0.0):
+        self.latency = latency
+        self._entries: Dict[str, List[dict]] = {}
+        self._positions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        with open(cassette_path, 'r') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries.setdefault(entry['key'], []).append(entry)
+
+    def lookup(self, model: str, prompt: str) -> dict:
+        """Next recorded exchange for model/prompt, raising LookupError if none."""
+        key = prompt_key(model, prompt)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                raise LookupError(f"no recorded response for {model} with this prompt")
+            position = self._positions.get(key, 0)
+            self._positions[key] = position + 1
+        return entries[min(position, len(entries) - 1)]
+
+    def generate_content(self, model: str, contents: str, config=None):
+        entry = self.lookup(model, contents)
+        if self.latency:
+            time.sleep(self.latency)
+        if entry['error']:
+            raise RuntimeError(f"(replayed) {entry['error']}")
+        return ReplayResponse(entry['response_text'])
+
+    def list_models(self) -> List[str]:
+        models = {entry['model'] for entries in self._entries.values() for entry in entries}
+        return sorted(f"models/{model}" for model in models)
+
+
+class StubGeminiServer:
+    """Local HTTP server implementing models.list and models.generateContent from a cassette."""
+
+    def __init__(self, cassette_path: str = DEFAULT_CASSETTE, latency: float = 0.0, host: str = '127.0.0.1', port: int = 0):
+        self.replay = ReplayBackend(cassette_path, latency=latency)
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'StubGeminiServer':
+        """Serve in a background daemon thread."""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _make_handler(self):
+        replay = self.replay
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, body: dict):
+                payload = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                if re.match(r'^/[^/]+/models/?(\?.*)?$', self.path):
+                    models = [{'name': name} for name in replay.list_models()]
+                    self._send_json(200, {'models': models})
+                else:
+                    self._send_json(404, {'error': {'code': 404, 'message': 'Not found', 'status': 'NOT_FOUND'}})
+
+            def do_POST(self):
+                match = re.match(r'^/[^/]+/models/([^/:]+):generateContent', self.path)
+                if not match:
+                    self._send_json(404, {'error': {'code': 404, 'message': 'Not found', 'status': 'NOT_FOUND'}})
+                    return
+
+                length = int(self.headers.get('Content-Length', 0))
+                request = json.loads(self.rfile.read(length) or b'{}')
+                prompt = ''.join(
+                    part.get('text', '')
+                    for content in request.get('contents', [])
+                    for part in content.get('parts', [])
+                )
+
+                try:
+                    entry = replay.lookup(match.group(1), prompt)
+                except LookupError as e:
+                    self._send_json(404, {'error': {'code': 404, 'message': str(e), 'status': 'NOT_FOUND'}})
+                    return
+
+                if replay.latency:
+                    time.sleep(replay.latency)
+
+                if entry['error']:
+                    self._send_json(503, {'error': {'code': 503, 'message': entry['error'], 'status': 'UNAVAILABLE'}})
+                    return
+
+                self._send_json(200, {
+                    'candidates': [{
+                        'content': {'role': 'model', 'parts': [{'text': entry['response_text'] or ''}]},
+                        'finishReason': 'STOP',
+                        'index': 0
+                    }]
+                })
+
+        return Handler
+
+
+def create_backend(
+    mode: str = 'live',
+    api_key: Optional[str] = None,
+    cassette_path: Optional[str] = None,
+    latency: float = 0.0
+):
+    """Build the backend for an LLM mode ('live', 'record', 'replay' or 'stub')."""
+    cassette_path = cassette_path or DEFAULT_CASSETTE
+
+    if mode in ('live', 'record'):
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY must be set in environment or passed as argument")
+        backend = GeminiBackend(api_key)
+        return RecordingBackend(backend, cassette_path) if mode == 'record' else backend
+
+    if mode == 'replay':
+        return ReplayBackend(cassette_path, latency=latency)
+
+    if mode == 'stub':
+        server = StubGeminiServer(cassette_path, latency=latency).start()
+        backend = GeminiBackend(api_key='stub', base_url=server.url)
+        backend.server = server
+        return backend
+
+    raise ValueError(f"Unknown LLM mode '{mode}', expected one of {LLM_MODES}")
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run a local stub of the Gemini API backed by a cassette')
+    parser.add_argument('command', choices=['serve'], help='Command to run')
+    parser.add_argument('--cassette', default=DEFAULT_CASSETTE, help=f'Cassette file (default: {DEFAULT_CASSETTE})')
+    parser.add_argument('--latency', type=float, default=0.0, help='Synthetic latency per response in seconds')
+    parser.add_argument('--host', default='127.0.0.1', help='Host to bind (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765, help='Port to bind (default: 8765)')
+
+    args = parser.parse_args()
+
+    server = StubGeminiServer(args.cassette, latency=args.latency, host=args.host, port=args.port)
+    print(f"🧪 Stub Gemini API serving {args.cassette} at {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,212 @@
+import json
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from llm_backends import create_backend
+
+try:
+    import fcntl
+except ImportError:  # Windows: rate limiting stays process-local
+    fcntl = None
+
+
+DEFAULT_RATE_LIMIT_FILE = ".cache/gemini_rate_limit.json"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a model is skipped because its circuit breaker is open."""
+
+
+class TokenBucket:
+    """Token-bucket rate limiter shared by threads and, via a locked state file, processes."""
+
+    def __init__(self, requests_per_minute: float, burst: Optional[int] = None, state_file: Optional[str] = None):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = float(burst or max(1, int(requests_per_minute // 6)))
+        self.state_file = Path(state_file) if state_file and fcntl else None
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._updated = time.time()
+
+    def acquire(self) -> float:
+        """Block until a token is available. Returns the seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                wait_time = self._take()
+            if wait_time <= 0:
+                return waited
+            time.sleep(wait_time)
+            waited += wait_time
+
+    def _take(self) -> float:
+        """Take a token if one is available, else return how long until one is."""
+        if self.state_file is None:
+            self._tokens, self._updated, wait_time = self._refill_and_take(self._tokens, self._updated)
+            return wait_time
+
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.state_file, 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                try:
+                    state = json.load(f)
+                    tokens, updated = float(state['tokens']), float(state['updated'])
+                except (ValueError, KeyError):
+                    tokens, updated = self.capacity, time.time()
+                tokens, updated, wait_time = self._refill_and_take(tokens, updated)
+                f.seek(0)
+                f.truncate()
+                json.dump({'tokens': tokens, 'updated': updated}, f)
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return wait_time
+
+    def _refill_and_take(self, tokens: float, updated: float) -> tuple:
+        now = time.time()
+        tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+        if tokens >= 1:
+            return tokens - 1, now, 0.0
+        return tokens, now, (1 - tokens) / self.rate
+
+
+class CircuitBreaker:
+    """Per-model breaker: opens after consecutive failures, half-opens after a cooldown."""
+
+    def __init__(self, failure_threshold: int = 2, cooldown: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if time.time() - self.opened_at >= self.cooldown:
+            return 'half_open'
+        return 'open'
+
+    def allow(self) -> bool:
+        """True if a request may be sent (closed, or half-open trial after cooldown)."""
+        return self.state != 'open'
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold or self.opened_at is not None:
+                # A failed half-open trial re-opens the breaker for another cooldown
+                self.opened_at = time.time()
+
+
+class GeminiClient:
+    """Gemini client wrapper with rate limiting, per-model circuit breakers and call metrics.
+
+    Requests go to a pluggable backend from llm_backends (live API by default).
+    Safe to share between threads; the rate limit is also shared between processes
+    that use the same state file.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        requests_per_minute: Optional[float] = 60,
+        rate_limit_file: Optional[str] = DEFAULT_RATE_LIMIT_FILE,
+        failure_threshold: int = 2,
+        breaker_cooldown: float = 60.0,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        backend=None
+    ):
+        self.backend = backend or create_backend('live', api_key=api_key)
+        self.rate_limiter = TokenBucket(requests_per_minute, state_file=rate_limit_file) if requests_per_minute else None
+        self.failure_threshold = failure_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._stats: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def _breaker(self, model: str) -> CircuitBreaker:
+        with self._lock:
+            if model not in self._breakers:
+                self._breakers[model] = CircuitBreaker(self.failure_threshold, self.breaker_cooldown)
+                self._stats[model] = {
+                    'attempts': 0,
+                    'successes': 0,
+                    'failures': 0,
+                    'skipped': 0,
+                    'total_latency': 0.0,
+                    'max_latency': 0.0,
+                    'rate_limit_wait': 0.0
+                }
+            return self._breakers[model]
+
+    def available_models(self, models: List[str]) -> List[str]:
+        """Models whose circuit breaker currently allows requests."""
+        return [model for model in models if self._breaker(model).allow()]
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Jittered exponential backoff delay for a zero-based retry attempt."""
+        cap = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return random.uniform(cap / 2, cap)
+
+    def generate_content(self, model: str, **kwargs):
+        """Call models.generate_content through the breaker, rate limiter and metrics."""
+        breaker = self._breaker(model)
+        stats = self._stats[model]
+
+        if not breaker.allow():
+            with self._lock:
+                stats['skipped'] += 1
+            raise CircuitOpenError(f"circuit open for {model}, skipping for up to {self.breaker_cooldown:.0f}s")
+
+        waited = self.rate_limiter.acquire() if self.rate_limiter else 0.0
+
+        start = time.perf_counter()
+        try:
+            response = self.backend.generate_content(model=model, **kwargs)
+        except Exception:
+            self._record(stats, time.perf_counter() - start, waited, success=False)
+            breaker.record_failure()
+            raise
+
+        self._record(stats, time.perf_counter() - start, waited, success=True)
+        breaker.record_success()
+        return response
+
+    def _record(self, stats: dict, latency: float, waited: float, success: bool):
+        with self._lock:
+            stats['attempts'] += 1
+            stats['successes' if success else 'failures'] += 1
+            stats['total_latency'] += latency
+            stats['max_latency'] = max(stats['max_latency'], latency)
+            stats['rate_limit_wait'] += waited
+
+    def list_models(self) -> List[str]:
+        return self.backend.list_models()
+
+    def metrics(self) -> Dict[str, dict]:
+        """Per-model attempt counts, latencies and breaker state."""
+        with self._lock:
+            models = list(self._stats)
+
+        result = {}
+        for model in models:
+            stats = dict(self._stats[model])
+            stats['mean_latency'] = stats['total_latency'] / stats['attempts'] if stats['attempts'] else 0.0
+            stats['breaker_state'] = self._breakers[model].state
+            result[model] = stats
+        return result
@@ -12,16 +12,56 @@ import sys
 import argparse
 import shutil
 from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+import pandas as pd
 from dotenv import load_dotenv
 from synthetic_data_generator import SyntheticDataGenerator
-from generate_eval_datasets import EvalDatasetGenerator
+from row_function_cache import DEFAULT_CACHE_DIR, RowFunctionCache
+from llm_backends import DEFAULT_CASSETTE, LLM_MODES
+from llm_client import GeminiClient
+from value_pools import DEFAULT_POOL_SIZE
+from data_io import FORMAT_EXTENSIONS, OUTPUT_FORMATS, TableWriter, as_read_back, count_rows, iter_table, read_schema, read_table, write_table
+from generate_eval_datasets import EvalDatasetGenerator, load_custom_metrics
+from eval_output import EVAL_FORMATS, read_eval_index
+from pipeline_manifest import STAGES, PipelineManifest
+from process_pool import process_pool
+from telemetry import METRICS_FILE, Telemetry
 
 # Load environment variables from .env file
 load_dotenv()
 
+# pandas reader used in the generated README for each output format
+READERS = {'csv': 'read_csv', 'parquet': 'read_parquet', 'arrow': 'read_feather'}
+
+# How the generated README loads eval cases: plain json, or the index for any format
+JSON_LOADER = """import json
+
+with open('eval_dataset_all.json', 'r') as f:
+    eval_data = json.load(f)
+
+# Access specific category
+for case in eval_data['categories']['data_aggregation']['cases']:
+    print(case['question'])
+    print(case['expected_result'])"""
+INDEX_LOADER = """from eval_output import read_eval_cases
+
+# Reads only this category's byte range of the JSONL file
+for case in read_eval_cases('.', 'data_aggregation'):
+    print(case['question'])
+    print(case['expected_result'])"""
+
 
 class DatasetPipeline:
-    def __init__(self, input_file: str, row_count: int, column_count: int = None, base_dir: str = "datasets", api_key: str = None):
+    def __init__(self, input_file: str, row_count: int, column_count: int = None, base_dir: str = "datasets", api_key: str = None,
+                 workers: int = 1, seed: int = None, chunk_size: int = None,
+                 cache_dir: str = DEFAULT_CACHE_DIR, use_cache: bool = True, refresh_cache: bool = False,
+                 hedge_delay: float = None, model_timeout: float = 120.0, requests_per_minute: float = 60,
+                 llm_mode: str = "live", cassette_path: str = DEFAULT_CASSETTE, replay_latency: float = 0.0,
+                 pool_size: int = DEFAULT_POOL_SIZE, pool_dir: str = None, unique_pools: bool = False,
+                 output_format: str = "csv", custom_metrics_file: str = None, eval_format: str = "json",
+                 force_stages: List[str] = None, metrics: bool = False, metrics_textfile: str = None,
+                 cache: RowFunctionCache = None, llm_client: GeminiClient = None):
         """
         Initialize the dataset generation pipeline.
         
@@ -31,12 +71,54 @@ class DatasetPipeline:
             column_count: Number of columns to use (optional, uses all by default)
             base_dir: Base directory for datasets (default: "datasets")
             api_key: Gemini API key (optional, can use env var)
+            workers: Number of worker processes for row generation (default: 1)
+            seed: Random seed for reproducible output (optional)
+            chunk_size: Stream rows to disk in chunks of this size (optional, constant memory)
+            cache_dir: Directory of the row function cache (default: ".cache/row_functions")
+            use_cache: Reuse cached Gemini row functions for the same schema and sample (default: True)
+            refresh_cache: Call Gemini even on a cache hit and overwrite the entry (default: False)
+            hedge_delay: Seconds before racing a backup model (optional, 0 = all models at once)
+            model_timeout: Timeout in seconds for each model request (default: 120)
+            requests_per_minute: Gemini rate limit shared across processes (default: 60, None disables)
+            llm_mode: "live", "record", "replay" or "stub" (replay and stub run offline)
+            cassette_path: Cassette file for record/replay/stub modes
+            replay_latency: Synthetic latency in seconds per replayed response (default: 0)
+            pool_size: Values pre-generated per Faker provider (default: 10000)
+            pool_dir: Directory to persist and reuse Faker value pools (optional)
+            unique_pools: Build Faker pools of distinct values (default: False)
+            output_format: Synthetic data format: "csv", "parquet" or "arrow" (default: "csv")
+            custom_metrics_file: JSON or YAML file of extra custom metric definitions (optional)
+            eval_format: Eval output format: "json", "json-compact", "jsonl" or "jsonl.zst" (default: "json")
+            force_stages: Stages to re-run even if up to date: any of STAGES, or "all" (optional)
+            metrics: Record per-stage wall time, CPU time, peak RSS and rows/sec to metrics.json (default: False)
+            metrics_textfile: Also write them to this Prometheus textfile (optional, implies metrics)
+            cache: Shared row function cache (optional, overrides cache_dir and use_cache)
+            llm_client: Shared Gemini client (optional, overrides the LLM settings above)
         """
         self.input_file = Path(input_file)
         self.row_count = row_count
         self.column_count = column_count
         self.base_dir = Path(base_dir)
         self.api_key = api_key
+        self.workers = workers
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.cache = cache if cache is not None else RowFunctionCache(cache_dir) if use_cache else None
+        self.llm_client = llm_client
+        self.refresh_cache = refresh_cache
+        self.hedge_delay = hedge_delay
+        self.model_timeout = model_timeout
+        self.requests_per_minute = requests_per_minute
+        self.llm_mode = llm_mode
+        self.cassette_path = cassette_path
+        self.replay_latency = replay_latency
+        self.pool_config = {'pool_size': pool_size, 'persist_dir': pool_dir, 'unique': unique_pools}
+        self.output_format = output_format
+        self.custom_metrics = load_custom_metrics(custom_metrics_file) if custom_metrics_file else None
+        self.eval_format = eval_format
+        self.force_stages = set(STAGES) if 'all' in (force_stages or []) else set(force_stages or [])
+        self.metrics_textfile = metrics_textfile
+        self.telemetry = Telemetry(enabled=metrics or bool(metrics_textfile))
         
         if not self.input_file.exists():
             raise FileNotFoundError(f"Input file not found: {input_file}")
@@ -62,8 +144,21 @@ class DatasetPipeline:
         
         return filename.replace('_', ' ').title().replace(' ', '')
     
-    def create_folder_structure(self):
-        """Create the required folder structure."""
+    def synthetic_data_path(self) -> Path:
+        """Path of the synthetic data file in this size's output folder."""
+        # Include column count in filename if specified
+        extension = FORMAT_EXTENSIONS[self.output_format]
+        if self.column_count:
+            output_filename = f"{self.dataset_name.lower()}_synthetic_{self.row_count}rows_{self.column_count}cols{extension}"
+        else:
+            output_filename = f"{self.dataset_name.lower()}_synthetic_{self.row_count}{extension}"
+        return self.output_dir / output_filename
+    
+    def create_folder_structure(self, refresh_sample: bool = False):
+        """Create the required folder structure.
+
+        refresh_sample copies the input over an existing sample file (when the input changed).
+        """
         print(f"\n📁 Creating folder structure...")
         
         self.dataset_dir.mkdir(parents=True, exist_ok=True)
@@ -75,11 +170,18 @@ class DatasetPipeline:
         if not self.sample_file.exists():
             shutil.copy2(self.input_file, self.sample_file)
             print(f"   ✅ Copied sample file: {self.sample_file}")
+        elif refresh_sample and not self.sample_file.samefile(self.input_file):
+            shutil.copy2(self.input_file, self.sample_file)
+            print(f"   ✅ Refreshed sample file: {self.sample_file}")
         else:
             print(f"   ℹ️  Sample file already exists: {self.sample_file}")
     
-    def generate_synthetic_data(self) -> Path:
-        """Generate synthetic data using Gemini AI."""
+    def generate_synthetic_data(self) -> Tuple[Path, Union[pd.DataFrame, dict]]:
+        """Generate synthetic data using Gemini AI.
+
+        Returns the written file and the data itself: the DataFrame, or the summary of the
+        streamed file (rows, columns, dtypes) when chunk_size is set.
+        """
         print(f"\n🤖 Generating synthetic data...")
         print(f"   Input: {self.sample_file}")
         print(f"   Rows: {self.row_count}")
@@ -87,52 +189,138 @@ class DatasetPipeline:
             print(f"   Columns: {self.column_count}")
         else:
             print(f"   Columns: All")
+        print(f"   Workers: {self.workers}")
         
-        # Include column count in filename if specified
-        if self.column_count:
-            output_filename = f"{self.dataset_name.lower()}_synthetic_{self.row_count}rows_{self.column_count}cols.csv"
-        else:
-            output_filename = f"{self.dataset_name.lower()}_synthetic_{self.row_count}.csv"
-        output_path = self.output_dir / output_filename
+        output_path = self.synthetic_data_path()
         
-        generator = SyntheticDataGenerator(api_key=self.api_key)
+        generator = SyntheticDataGenerator(
+            api_key=self.api_key,
+            cache=self.cache,
+            refresh_cache=self.refresh_cache,
+            hedge_delay=self.hedge_delay,
+            model_timeout=self.model_timeout,
+            requests_per_minute=self.requests_per_minute,
+            llm_mode=self.llm_mode,
+            cassette_path=self.cassette_path,
+            replay_latency=self.replay_latency,
+            pool_config=self.pool_config,
+            telemetry=self.telemetry,
+            llm_client=self.llm_client
+        )
         
         df = generator.generate_synthetic_data(
             sample_csv_path=str(self.sample_file),
             num_rows=self.row_count,
             num_columns=self.column_count,
-            output_path=str(output_path)
+            output_path=str(output_path),
+            workers=self.workers,
+            seed=self.seed,
+            chunk_size=self.chunk_size,
+            output_format=self.output_format
         )
         
+        for model, stats in generator.llm.metrics().items():
+            print(f"   📡 {model}: {stats['attempts']} call(s), {stats['failures']} failed, "
+                  f"{stats['mean_latency']:.1f}s avg, circuit {stats['breaker_state']}")
+        
+        if self.cache is not None:
+            stats = self.cache.stats()
+            print(f"   💾 Row function cache: {stats['hits']} hit(s), {stats['misses']} miss(es)")
+        
         print(f"   ✅ Generated: {output_path}")
-        print(f"   📊 Shape: {df.shape}")
+        if isinstance(df, dict):
+            print(f"   📊 Shape: ({df['rows']}, {len(df['columns'])}) streamed in {df['chunks']} chunks")
+        else:
+            print(f"   📊 Shape: {df.shape}")
         
-        return output_path
+        return output_path, df
     
-    def generate_eval_datasets(self, synthetic_data_path: Path):
-        """Generate evaluation datasets."""
+    def generate_eval_datasets(self, synthetic_data_path: Path, synthetic_data: pd.DataFrame = None) -> Tuple[dict, dict]:
+        """Generate evaluation datasets.
+
+        Uses synthetic_data when given (the DataFrame from generate_synthetic_data) instead of
+        reading the file back. Returns the written files and the eval index (metadata and
+        per-category counts).
+        """
         print(f"\n📝 Generating evaluation datasets...")
         
-        eval_generator = EvalDatasetGenerator(str(synthetic_data_path))
+        # Streamed datasets are also evaluated out-of-core, in chunks of the same size
+        eval_generator = EvalDatasetGenerator(
+            synthetic_data if isinstance(synthetic_data, pd.DataFrame) else str(synthetic_data_path),
+            custom_metrics=self.custom_metrics,
+            chunk_size=self.chunk_size,
+            telemetry=self.telemetry
+        )
         
-        print(f"   📈 Dataset info: {len(eval_generator.df)} rows, {len(eval_generator.df.columns)} columns")
-        print(f"   📅 Date range: {eval_generator.df['Date'].min()} to {eval_generator.df['Date'].max()}")
+        if eval_generator.df is None:
+            print(f"   🧱 Out-of-core mode: aggregating in chunks of {self.chunk_size} rows")
+        else:
+            print(f"   📈 Dataset info: {len(eval_generator.df)} rows, {len(eval_generator.df.columns)} columns")
+            report = eval_generator.memory_report
+            print(f"   💾 Memory: {report['before_bytes'] / 1e6:.2f} MB loaded -> {report['after_bytes'] / 1e6:.2f} MB optimized")
+            print(f"   📅 Date range: {eval_generator.df['Date'].min()} to {eval_generator.df['Date'].max()}")
         
-        output_files = eval_generator.generate_all_evals(output_dir=str(self.output_dir))
+        output_files = eval_generator.generate_all_evals(
+            output_dir=str(self.output_dir),
+            seed=self.seed,
+            workers=self.workers,
+            output_format=self.eval_format
+        )
         
-        return output_files
+        return output_files, eval_generator.eval_index
     
-    def generate_summary(self, synthetic_data_path: Path, eval_files: dict):
-        """Generate a summary file with all details."""
-        summary_path = self.output_dir / "README.md"
+    def _data_profile(self, synthetic_data_path: Path, synthetic_data, date_range: dict = None) -> dict:
+        """Row/column counts and date range of the synthetic data for the summary.
+
+        Uses the DataFrame when there is one. For streamed data, counts come from the
+        stream summary and the file's schema, and the date range from the eval metadata.
+        When nothing was handed over (generation was skipped), the data is read back, or,
+        with chunk_size, only its rows are counted.
+        """
+        if synthetic_data is None and self.chunk_size:
+            synthetic_data = {'rows': count_rows(str(synthetic_data_path), self.chunk_size)}
+        elif synthetic_data is None:
+            synthetic_data = read_table(str(synthetic_data_path))
         
-        import pandas as pd
-        import json
+        if isinstance(synthetic_data, pd.DataFrame):
+            df = synthetic_data
+            dtypes = dict(df.dtypes)
+            rows = len(df)
+            if 'Date' in df.columns:
+                date_range = {'start': df['Date'].min(), 'end': df['Date'].max()}
+        else:
+            dtypes = {col: pd.api.types.pandas_dtype(dtype) for col, dtype in read_schema(str(synthetic_data_path)).items()}
+            rows = synthetic_data['rows']
         
-        df = pd.read_csv(synthetic_data_path)
+        kinds = [
+            'numeric' if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+            else 'categorical' if pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype)
+            or isinstance(dtype, pd.CategoricalDtype) else 'other'
+            for col, dtype in dtypes.items() if col != 'Date'
+        ]
+        return {
+            'rows': rows,
+            'columns': len(dtypes),
+            'numeric': kinds.count('numeric'),
+            'categorical': kinds.count('categorical'),
+            'has_date': 'Date' in dtypes,
+            'date_start': (date_range or {}).get('start'),
+            'date_end': (date_range or {}).get('end')
+        }
+    
+    def generate_summary(self, synthetic_data_path: Path, eval_files: dict,
+                         synthetic_data: Union[pd.DataFrame, dict] = None, eval_index: dict = None):
+        """Generate a summary file with all details.
+
+        synthetic_data and eval_index are the handles returned by the earlier stages;
+        without them the data and the eval index are read back from disk.
+        """
+        summary_path = self.output_dir / "README.md"
         
-        with open(eval_files['combined'], 'r') as f:
-            eval_data = json.load(f)
+        # The index holds metadata and per-category counts for every eval format
+        eval_data = eval_index if eval_index is not None else read_eval_index(self.output_dir)
+        profile = self._data_profile(synthetic_data_path, synthetic_data, eval_data['metadata'].get('date_range'))
+        eval_tree = "\n".join(f"    ├── {Path(path).name}" for name, path in eval_files.items())
         
         summary = f"""# {self.dataset_name} Dataset - {self.row_count} Rows
 
@@ -145,27 +333,25 @@ Generated on: {eval_data['metadata']['generated_at']}
 ├── {self.sample_file.name}              # Original sample file
 └── {self.row_count}/
     ├── {synthetic_data_path.name}       # Synthetic data ({self.row_count} rows)
-    ├── eval_dataset_all.json            # All evaluation cases
-    ├── eval_dataset_aggregation.json    # Data aggregation tests
-    ├── eval_dataset_time_comparison.json # Time comparison tests
-    └── eval_dataset_custom_metrics.json  # Custom metrics tests
+{eval_tree}
+    └── README.md
 ```
 
 ## Synthetic Data
 
 - **File**: `{synthetic_data_path.name}`
-- **Rows**: {len(df):,}
-- **Columns**: {len(df.columns)}
+- **Rows**: {profile['rows']:,}
+- **Columns**: {profile['columns']}
 - **File Size**: {synthetic_data_path.stat().st_size / 1024 / 1024:.2f} MB
 
 ### Column Summary
-- Numeric columns: {len(df.select_dtypes(include=['float64', 'int64']).columns)}
-- Categorical columns: {len(df.select_dtypes(include=['object']).columns)}
-- Date columns: {'Date' if 'Date' in df.columns else 'None'}
+- Numeric columns: {profile['numeric']}
+- Categorical columns: {profile['categorical']}
+- Date columns: {'Date' if profile['has_date'] else 'None'}
 
 ### Date Range
-- Start: {df['Date'].min()}
-- End: {df['Date'].max()}
+- Start: {profile['date_start']}
+- End: {profile['date_end']}
 
 ## Evaluation Datasets
 
@@ -197,21 +383,13 @@ Total test cases: **{eval_data['metadata']['total_cases']}**
 ```python
 import pandas as pd
 
-df = pd.read_csv('{synthetic_data_name}')
+df = pd.{reader}('{synthetic_data_name}')
 print(df.head())
 ```
 
 ### Load Evaluation Cases
 ```python
-import json
-
-with open('eval_dataset_all.json', 'r') as f:
-    eval_data = json.load(f)
-
-# Access specific category
-for case in eval_data['categories']['data_aggregation']['cases']:
-    print(case['question'])
-    print(case['expected_result'])
+{eval_loader}
 ```
 
 ### Test Your AI Agent
@@ -219,7 +397,7 @@ for case in eval_data['categories']['data_aggregation']['cases']:
 # See ../../../example_eval_usage.py for complete example
 from example_eval_usage import run_evaluation
 
-run_evaluation('eval_dataset_all.json', '{synthetic_data_name}')
+run_evaluation('{combined_name}', '{synthetic_data_name}')
 ```
 
 ## Next Steps
@@ -231,15 +409,52 @@ run_evaluation('eval_dataset_all.json', '{synthetic_data_name}')
 
 ---
 Generated with `main.py`
-""".format(synthetic_data_name=synthetic_data_path.name)
+""".format(
+            synthetic_data_name=synthetic_data_path.name,
+            reader=READERS[self.output_format],
+            combined_name=Path(eval_files['combined']).name,
+            eval_loader=JSON_LOADER if self.eval_format == 'json' else INDEX_LOADER
+        )
         
         with open(summary_path, 'w') as f:
             f.write(summary)
         
         print(f"\n📄 Generated summary: {summary_path}")
     
+    def _is_up_to_date(self, manifest: PipelineManifest, stage: str, inputs: dict, params: dict) -> bool:
+        if stage in self.force_stages or not manifest.is_fresh(stage, inputs, params):
+            return False
+        print(f"\n⏭️  Skipping {stage}: up to date in {manifest.path.name}")
+        self.telemetry.info.setdefault('skipped_stages', []).append(stage)
+        return True
+    
+    def write_metrics(self, status: str):
+        """Write the recorded telemetry to metrics.json (and the Prometheus textfile), if enabled."""
+        if not self.telemetry.enabled:
+            return
+        
+        labels = {'dataset': self.dataset_name, 'size': self.output_dir.name}
+        metrics_path = self.telemetry.write_json(self.output_dir / METRICS_FILE, **labels, status=status)
+        print(f"\n⏱️  Metrics: {metrics_path}")
+        for step in self.telemetry.report()['steps']:
+            rate = f", {step['rows_per_second']:,.0f} rows/s" if step['rows_per_second'] else ""
+            print(f"   {step['step']}: {step['wall_seconds']:.2f}s wall, {step['cpu_seconds']:.2f}s CPU{rate}")
+        if self.metrics_textfile:
+            print(f"   📈 Prometheus textfile: {self.telemetry.write_prometheus(self.metrics_textfile, labels)}")
+    
     def run(self):
-        """Run the complete pipeline."""
+        """Run the pipeline; on failure, print the error and exit with status 1."""
+        try:
+            self.execute()
+        except Exception as e:
+            print(f"\n❌ Error: {e}")
+            import traceback
+            traceback.print_exc()
+            self.write_metrics('failed')
+            sys.exit(1)
+    
+    def execute(self):
+        """Run the complete pipeline, skipping stages that are up to date. Raises on failure."""
         print("="*70)
         print(f"🚀 Starting Dataset Generation Pipeline")
         print("="*70)
@@ -249,31 +464,234 @@ Generated with `main.py`
         print(f"Output: {self.output_dir}")
         print("="*70)
         
+        # Stages recorded in the manifest as up to date are skipped; a re-run resumes at
+        # the first stale or failed stage, reading skipped stages' outputs from disk
+        manifest = PipelineManifest(self.output_dir)
+        synthetic_data = eval_index = None
+        
+        inputs = {'input_file': self.input_file}
+        if not self._is_up_to_date(manifest, 'setup', inputs, {}):
+            with manifest.run_stage('setup', inputs, {}) as outputs, self.telemetry.step('setup'):
+                self.create_folder_structure(refresh_sample='setup' in manifest.stages)
+                outputs['sample'] = self.sample_file
+        
+        # Each stage that runs hands its in-memory results to the next
+        synthetic_data_path = self.synthetic_data_path()
+        inputs = {'sample': self.sample_file}
+        params = {'rows': self.row_count, 'columns': self.column_count, 'seed': self.seed, 'workers': self.workers,
+                  'chunk_size': self.chunk_size, 'format': self.output_format}
+        if not self._is_up_to_date(manifest, 'generate', inputs, params):
+            with manifest.run_stage('generate', inputs, params) as outputs, self.telemetry.step('generate', rows=self.row_count):
+                synthetic_data_path, synthetic_data = self.generate_synthetic_data()
+                outputs['synthetic_data'] = synthetic_data_path
+            if isinstance(synthetic_data, pd.DataFrame):
+                # Typed like a read of the written file, so evals match a resumed run's
+                synthetic_data = as_read_back(synthetic_data, self.output_format)
+        
+        inputs = {'synthetic_data': synthetic_data_path}
+        params = {'seed': self.seed, 'eval_format': self.eval_format, 'custom_metrics': self.custom_metrics}
+        if self._is_up_to_date(manifest, 'evals', inputs, params):
+            eval_files = {name: str(path) for name, path in manifest.outputs('evals').items()}
+        else:
+            with manifest.run_stage('evals', inputs, params) as outputs, self.telemetry.step('evals'):
+                eval_files, eval_index = self.generate_eval_datasets(synthetic_data_path, synthetic_data)
+                outputs.update(eval_files)
+        
+        inputs = {'synthetic_data': synthetic_data_path, **eval_files}
+        if not self._is_up_to_date(manifest, 'summary', inputs, {}):
+            with manifest.run_stage('summary', inputs, {}) as outputs, self.telemetry.step('summary'):
+                self.generate_summary(synthetic_data_path, eval_files, synthetic_data, eval_index)
+                outputs['readme'] = self.output_dir / "README.md"
+        
+        self.write_metrics('completed')
+        
+        print("\n" + "="*70)
+        print("✅ Pipeline completed successfully!")
+        print("="*70)
+        print(f"\n📁 Output directory: {self.output_dir}")
+        print(f"\n📊 Files generated:")
+        print(f"   - {synthetic_data_path.name}")
+        for name, path in eval_files.items():
+            print(f"   - {Path(path).name}")
+        print(f"   - README.md")
+        print("\n" + "="*70)
+
+
+def _evaluate_size(pipeline: DatasetPipeline, synthetic_data_path: Path, synthetic_data) -> dict:
+    """Evals and summary of one size (runs inside worker processes)."""
+    if isinstance(synthetic_data, pd.DataFrame):
+        synthetic_data = as_read_back(synthetic_data, pipeline.output_format)
+    with pipeline.telemetry.step('evals'):
+        eval_files, eval_index = pipeline.generate_eval_datasets(synthetic_data_path, synthetic_data)
+    with pipeline.telemetry.step('summary'):
+        pipeline.generate_summary(synthetic_data_path, eval_files, synthetic_data, eval_index)
+    pipeline.write_metrics('completed')
+    return eval_files
+
+
+class FanOutPipeline:
+    """Every combination of row and column counts from a single generation pass.
+
+    The largest size (most columns, most rows) is generated once, with one Gemini call.
+    Each smaller size is its first rows and first columns: row counts are nested
+    prefixes, and column counts select the same leading sample columns a separate run
+    would ask Gemini for. Every size folder then gets its own evals and README, with
+    sizes evaluated in parallel when workers > 1.
+    
+    Fan-out runs are not checkpointed: they neither read nor write pipeline manifests,
+    so every run regenerates and re-evaluates all sizes.
+    """
+
+    def __init__(self, input_file: str, row_counts: List[int], column_counts: Optional[List[Optional[int]]] = None,
+                 workers: int = 1, **options):
+        """
+        Initialize the fan-out pipeline.
+        
+        Args:
+            input_file: Path to input CSV file
+            row_counts: Row counts to produce, e.g. [100, 1000, 5000, 10000]
+            column_counts: Column counts to produce (optional, uses all columns by default)
+            workers: Worker processes for generating the largest size and for evaluating sizes
+            **options: Any other DatasetPipeline argument, shared by all sizes
+        """
+        self.workers = workers
+        self.chunk_size = options.get('chunk_size')
+        column_counts = sorted(set(column_counts or [None]), key=lambda count: count or float('inf'))
+        
+        # Largest size last: it is the one that gets generated
+        self.pipelines = [
+            DatasetPipeline(input_file, row_count, column_count, workers=workers, **options)
+            for column_count in column_counts
+            for row_count in sorted(set(row_counts))
+        ]
+        self.largest = self.pipelines[-1]
+        
+        # One Prometheus textfile per size, e.g. pipeline_500rows_3cols.prom
+        for pipeline in self.pipelines:
+            if pipeline.metrics_textfile:
+                textfile = Path(pipeline.metrics_textfile)
+                pipeline.metrics_textfile = str(textfile.with_name(f"{textfile.stem}_{pipeline.output_dir.name}{textfile.suffix}"))
+    
+    def _project(self, data: pd.DataFrame, pipeline: DatasetPipeline) -> pd.DataFrame:
+        columns = data.columns[:pipeline.column_count] if pipeline.column_count else data.columns
+        return data.iloc[:pipeline.row_count][columns]
+    
+    def derive_sizes(self, synthetic_data_path: Path, synthetic_data) -> List[Tuple[Path, Union[pd.DataFrame, dict]]]:
+        """Write every smaller size from the generated data.
+
+        Returns (path, data) per pipeline, in the same form generate_synthetic_data does:
+        DataFrames in memory, or stream summaries when chunk_size is set, in which case
+        all sizes are written from one chunked pass over the largest file.
+        """
+        print(f"\n✂️  Deriving {len(self.pipelines) - 1} smaller size(s) from {synthetic_data_path.name}...")
+        smaller = self.pipelines[:-1]
+        
+        if isinstance(synthetic_data, pd.DataFrame):
+            derived = []
+            for pipeline in smaller:
+                df = self._project(synthetic_data, pipeline)
+                output_path = pipeline.synthetic_data_path()
+                write_table(df, str(output_path), pipeline.output_format)
+                print(f"   ✅ {output_path} {df.shape}")
+                derived.append((output_path, df))
+            return derived + [(synthetic_data_path, synthetic_data)]
+        
+        writers = [TableWriter(str(pipeline.synthetic_data_path()), pipeline.output_format) for pipeline in smaller]
+        chunks = [0] * len(smaller)
+        remaining = max(pipeline.row_count for pipeline in smaller)
+        try:
+            for chunk in iter_table(str(synthetic_data_path), chunk_size=self.chunk_size):
+                for i, (pipeline, writer) in enumerate(zip(smaller, writers)):
+                    if writer.rows_written < pipeline.row_count:
+                        writer.write(self._project(chunk, pipeline).iloc[:pipeline.row_count - writer.rows_written])
+                        chunks[i] += 1
+                remaining -= len(chunk)
+                if remaining <= 0:
+                    break
+        finally:
+            for writer in writers:
+                writer.close()
+        
+        derived = []
+        for pipeline, writer, num_chunks in zip(smaller, writers, chunks):
+            print(f"   ✅ {writer.path} ({writer.rows_written}, {len(writer.columns or [])})")
+            derived.append((Path(writer.path), {
+                'path': writer.path,
+                'format': writer.output_format,
+                'rows': writer.rows_written,
+                'columns': writer.columns or [],
+                'dtypes': writer.dtypes,
+                'chunks': num_chunks
+            }))
+        return derived + [(synthetic_data_path, synthetic_data)]
+    
+    def run(self):
+        """Run the fan-out; on failure, print the error and exit with status 1."""
         try:
-            self.create_folder_structure()
-            
-            synthetic_data_path = self.generate_synthetic_data()
-            
-            eval_files = self.generate_eval_datasets(synthetic_data_path)
-            
-            self.generate_summary(synthetic_data_path, eval_files)
-            
-            print("\n" + "="*70)
-            print("✅ Pipeline completed successfully!")
-            print("="*70)
-            print(f"\n📁 Output directory: {self.output_dir}")
-            print(f"\n📊 Files generated:")
-            print(f"   - {synthetic_data_path.name}")
-            for name, path in eval_files.items():
-                print(f"   - {Path(path).name}")
-            print(f"   - README.md")
-            print("\n" + "="*70)
-            
+            self.execute()
         except Exception as e:
             print(f"\n❌ Error: {e}")
             import traceback
             traceback.print_exc()
             sys.exit(1)
+    
+    def execute(self):
+        """Generate the largest size, derive the others, and evaluate every size. Raises on failure."""
+        print("="*70)
+        print(f"🚀 Starting Multi-Size Dataset Generation Pipeline")
+        print("="*70)
+        print(f"Dataset: {self.largest.dataset_name}")
+        print(f"Sizes: {', '.join(pipeline.output_dir.name for pipeline in self.pipelines)}")
+        print(f"Generated once: {self.largest.output_dir.name}")
+        print("="*70)
+        
+        for pipeline in self.pipelines:
+            pipeline.create_folder_structure()
+        
+        with self.largest.telemetry.step('generate', rows=self.largest.row_count):
+            generated = self.largest.generate_synthetic_data()
+        with self.largest.telemetry.step('derive_sizes'):
+            sizes = self.derive_sizes(*generated)
+        
+        if self.workers > 1:
+            # Parallelism is across sizes, so each size evaluates its categories serially
+            print(f"\n⚙️  Evaluating {len(sizes)} sizes with {min(self.workers, len(sizes))} worker(s)...")
+            for pipeline in self.pipelines:
+                pipeline.workers = 1
+                # Generation is done; the client holds locks and cannot be sent to workers
+                pipeline.llm_client = None
+            with process_pool(min(self.workers, len(sizes))) as executor:
+                futures = [
+                    executor.submit(_evaluate_size, pipeline, path, data)
+                    for pipeline, (path, data) in zip(self.pipelines, sizes)
+                ]
+                all_eval_files = [future.result() for future in futures]
+        else:
+            all_eval_files = [_evaluate_size(pipeline, path, data) for pipeline, (path, data) in zip(self.pipelines, sizes)]
+        
+        print("\n" + "="*70)
+        print("✅ Pipeline completed successfully!")
+        print("="*70)
+        print(f"\n📁 Output directories:")
+        for pipeline, (path, data), eval_files in zip(self.pipelines, sizes, all_eval_files):
+            print(f"   - {pipeline.output_dir}: {path.name}, {len(eval_files)} eval file(s), README.md")
+        print("\n" + "="*70)
+
+
+def build_pipeline(input_file: str, row_counts: List[int], column_counts: Optional[List[int]] = None,
+                   **options) -> Union[DatasetPipeline, FanOutPipeline]:
+    """A DatasetPipeline for one size, or a FanOutPipeline for several row or column counts."""
+    if len(row_counts) > 1 or (column_counts and len(column_counts) > 1):
+        return FanOutPipeline(input_file, row_counts, column_counts, **options)
+    return DatasetPipeline(input_file, row_counts[0], column_counts[0] if column_counts else None, **options)
+
+
+def _count_list(value: str) -> List[int]:
+    """argparse type for a count or a comma-separated list of counts, e.g. 100,1000,5000."""
+    try:
+        return [int(part) for part in value.split(',')]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected an integer or comma-separated integers, got '{value}'")
 
 
 def main():
@@ -288,6 +706,9 @@ Examples:
   # Generate with specific number of columns
   python3 main.py appsflyer.csv --rows 5000 --columns 20
   
+  # Several sizes from one generation pass (nested row prefixes, leading columns)
+  python3 main.py appsflyer.csv --rows 100,1000,5000,10000 --columns 6,8,10
+  
   # Generate from existing sample file
   python3 main.py datasets/Appsflyer/appsflyer_sample.csv --rows 10000
   
@@ -297,27 +718,86 @@ Examples:
     )
     
     parser.add_argument('input_file', help='Path to input CSV file')
-    parser.add_argument('--rows', '-r', type=int, required=True, help='Number of rows to generate')
-    parser.add_argument('--columns', '-c', type=int, help='Number of columns to use (optional, uses all by default)')
+    parser.add_argument('--rows', '-r', type=_count_list, required=True, help='Number of rows to generate, or a comma-separated list of sizes')
+    parser.add_argument('--columns', '-c', type=_count_list, help='Number of columns to use, or a comma-separated list (optional, uses all by default)')
     parser.add_argument('--base-dir', '-b', default='datasets', help='Base directory for datasets (default: datasets)')
     parser.add_argument('--api-key', '-k', help='Gemini API key (or set GEMINI_API_KEY env var)')
+    parser.add_argument('--workers', '-w', type=int, default=1, help='Number of worker processes for row generation (default: 1)')
+    parser.add_argument('--seed', type=int, help='Random seed; same seed and worker count give identical data (optional)')
+    parser.add_argument('--format', '-f', choices=OUTPUT_FORMATS, default='csv', help='Synthetic data format: csv, parquet or arrow (default: csv)')
+    parser.add_argument('--chunk-size', type=int, help='Stream rows to the CSV in chunks of this size to bound memory (optional)')
+    parser.add_argument('--hedge-delay', type=float, help='Race models: start a backup model after this many seconds (0 = all at once)')
+    parser.add_argument('--model-timeout', type=float, default=120.0, help='Timeout in seconds for each model request (default: 120)')
+    parser.add_argument('--rpm', type=float, default=60, help='Max Gemini requests per minute, shared across processes (default: 60, 0 disables)')
+    parser.add_argument('--llm-mode', choices=LLM_MODES, default='live', help='live, record to a cassette, replay a cassette, or serve it from a local stub API (default: live)')
+    parser.add_argument('--cassette', default=DEFAULT_CASSETTE, help=f'Cassette file for record/replay/stub (default: {DEFAULT_CASSETTE})')
+    parser.add_argument('--replay-latency', type=float, default=0.0, help='Synthetic latency in seconds per replayed response (default: 0)')
+    parser.add_argument('--pool-size', type=int, default=DEFAULT_POOL_SIZE, help=f'Values pre-generated per Faker provider (default: {DEFAULT_POOL_SIZE})')
+    parser.add_argument('--pool-dir', help='Directory to persist and reuse Faker value pools (optional)')
+    parser.add_argument('--unique-pools', action='store_true', help='Build pools of distinct values')
+    parser.add_argument('--custom-metrics', help='JSON or YAML file of extra custom metric definitions for the eval datasets')
+    parser.add_argument('--eval-format', choices=EVAL_FORMATS, default='json', help='Eval output format: json, json-compact, jsonl or jsonl.zst (default: json)')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help=f'Row function cache directory (default: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--no-cache', action='store_true', help='Always call Gemini; do not read or write the row function cache')
+    parser.add_argument('--refresh-cache', action='store_true', help='Call Gemini and overwrite the cached row function')
+    parser.add_argument('--metrics', action='store_true', help='Record per-stage wall time, CPU time, peak RSS and rows/sec to metrics.json in the output folder')
+    parser.add_argument('--metrics-textfile', help='Also write the metrics to this Prometheus textfile (implies --metrics)')
+    parser.add_argument('--force', action='append', choices=STAGES + ['all'], default=[],
+                        help='Re-run a stage even if its checkpoint is up to date (repeatable; "all" re-runs everything)')
     
     args = parser.parse_args()
     
-    if args.rows <= 0:
+    if min(args.rows) <= 0:
         print("❌ Error: Number of rows must be positive")
         sys.exit(1)
     
-    if args.columns is not None and args.columns <= 0:
+    if args.columns is not None and min(args.columns) <= 0:
         print("❌ Error: Number of columns must be positive")
         sys.exit(1)
     
-    pipeline = DatasetPipeline(
-        input_file=args.input_file,
-        row_count=args.rows,
-        column_count=args.columns,
+    if args.workers <= 0:
+        print("❌ Error: Number of workers must be positive")
+        sys.exit(1)
+    
+    if args.pool_size <= 0:
+        print("❌ Error: Pool size must be positive")
+        sys.exit(1)
+    
+    if args.model_timeout <= 0:
+        print("❌ Error: Model timeout must be positive")
+        sys.exit(1)
+    
+    if args.chunk_size is not None and args.chunk_size <= 0:
+        print("❌ Error: Chunk size must be positive")
+        sys.exit(1)
+    
+    pipeline = build_pipeline(
+        args.input_file,
+        args.rows,
+        args.columns,
+        workers=args.workers,
         base_dir=args.base_dir,
-        api_key=args.api_key
+        api_key=args.api_key,
+        seed=args.seed,
+        chunk_size=args.chunk_size,
+        cache_dir=args.cache_dir,
+        use_cache=not args.no_cache,
+        refresh_cache=args.refresh_cache,
+        hedge_delay=args.hedge_delay,
+        model_timeout=args.model_timeout,
+        requests_per_minute=args.rpm or None,
+        llm_mode=args.llm_mode,
+        cassette_path=args.cassette,
+        replay_latency=args.replay_latency,
+        pool_size=args.pool_size,
+        pool_dir=args.pool_dir,
+        unique_pools=args.unique_pools,
+        output_format=args.format,
+        custom_metrics_file=args.custom_metrics,
+        eval_format=args.eval_format,
+        force_stages=args.force,
+        metrics=args.metrics,
+        metrics_textfile=args.metrics_textfile
     )
     
     pipeline.run()
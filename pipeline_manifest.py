@@ -0,0 +1,148 @@
+"""
+Stage checkpoints for DatasetPipeline.
+
+Each output folder keeps a pipeline_manifest.json recording, per stage, the content
+hashes of the files it read, the parameters it ran with and the files it wrote. A
+stage is up to date when it last completed, its parameters are unchanged, and every
+input and output still has its recorded hash; re-runs skip such stages and resume at
+the first stale or failed one. Since a stage's inputs are its upstream stages'
+outputs, re-running a stage only invalidates what follows if its outputs changed.
+
+Hashing a large file is not free, so a file whose size and mtime match its last
+recorded hash is trusted without being read again.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+
+MANIFEST_FILE = "pipeline_manifest.json"
+STAGES = ['setup', 'generate', 'evals', 'summary']
+
+
+def _normalize(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Parameters as they read back from the manifest, so comparisons are like for like."""
+    return json.loads(json.dumps(params, sort_keys=True, default=str))
+
+
+class PipelineManifest:
+    """Per-stage input hashes, parameters and outputs of one output folder."""
+
+    def __init__(self, output_dir: str):
+        self.output_dir = Path(output_dir)
+        self.path = self.output_dir / MANIFEST_FILE
+        try:
+            with open(self.path, 'r') as f:
+                self.stages: Dict[str, Dict[str, Any]] = json.load(f).get('stages', {})
+        except FileNotFoundError:
+            self.stages = {}
+        except ValueError:
+            # A corrupt manifest only costs a full re-run
+            self.stages = {}
+
+        # Absolute path -> last known (size, mtime_ns, sha256), from every stage
+        self._known: Dict[str, Dict[str, Any]] = {}
+        for entry in self.stages.values():
+            for record in list(entry.get('inputs', {}).values()) + list(entry.get('outputs', {}).values()):
+                if record is not None:
+                    self._known[str(self._resolve(record['path']))] = record
+
+    def _relative(self, path) -> str:
+        # Relative to the folder, so the dataset tree can be moved without invalidating it
+        return os.path.relpath(Path(path).resolve(), self.output_dir.resolve())
+
+    def _resolve(self, path: str) -> Path:
+        return (self.output_dir / path).resolve()
+
+    def _file_record(self, path) -> Optional[Dict[str, Any]]:
+        """Path, size, mtime and sha256 of a file, or None if it does not exist."""
+        path = Path(path).resolve()
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+
+        known = self._known.get(str(path))
+        if known is not None and known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns:
+            return known
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        record = {
+            'path': self._relative(path),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': digest.hexdigest()
+        }
+        self._known[str(path)] = record
+        return record
+
+    def is_fresh(self, stage: str, inputs: Dict[str, Any], params: Dict[str, Any]) -> bool:
+        """Whether stage last completed with these params, inputs and still-intact outputs."""
+        entry = self.stages.get(stage)
+        if entry is None or entry.get('status') != 'completed' or entry.get('params') != _normalize(params):
+            return False
+        if set(entry['inputs']) != set(inputs):
+            return False
+
+        for name, path in inputs.items():
+            record, recorded = self._file_record(path), entry['inputs'][name]
+            if record is None or recorded is None or record['sha256'] != recorded['sha256']:
+                return False
+        for record in entry['outputs'].values():
+            current = self._file_record(self._resolve(record['path']))
+            if current is None or current['sha256'] != record['sha256']:
+                return False
+        return True
+
+    def outputs(self, stage: str) -> Dict[str, Path]:
+        """Recorded outputs of a completed stage, by name."""
+        return {name: self._resolve(record['path']) for name, record in self.stages[stage]['outputs'].items()}
+
+    @contextmanager
+    def run_stage(self, stage: str, inputs: Dict[str, Any], params: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Record a stage run: yields a dict for the body to fill with its outputs by name.
+
+        Inputs are hashed before the body runs; on success the outputs are hashed and
+        the stage is marked completed, on an exception it is marked failed (and the
+        exception propagates). The manifest is saved either way.
+        """
+        entry = {
+            'status': 'running',
+            'params': _normalize(params),
+            'inputs': {name: self._file_record(path) for name, path in inputs.items()},
+            'outputs': {},
+            'started_at': time.time()
+        }
+        outputs: Dict[str, Any] = {}
+        try:
+            yield outputs
+        except BaseException as e:
+            entry.update(status='failed', error=f"{type(e).__name__}: {e}", finished_at=time.time())
+            self.stages[stage] = entry
+            self.save()
+            raise
+
+        entry.update(
+            status='completed',
+            outputs={name: self._file_record(path) for name, path in outputs.items()},
+            finished_at=time.time()
+        )
+        self.stages[stage] = entry
+        self.save()
+
+    def save(self):
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        # Write atomically so an interrupted save never leaves a truncated manifest
+        fd, tmp_path = tempfile.mkstemp(dir=self.output_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'stages': self.stages}, f, indent=2)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,22 @@
+"""
+Worker process pools that are safe to start from any thread.
+
+A forked child gets a copy of every lock in the parent, held or not, but only the
+forking thread. When other threads are running (e.g. batch_runner jobs building value
+pools or caching row functions), a lock one of them holds at fork time stays held in
+the child forever. Pools started outside the main thread therefore spawn fresh
+interpreters instead; the main thread keeps the platform default (fork on Linux),
+which starts faster and shares already-built value pools with the workers.
+"""
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+
+def process_pool(max_workers: int) -> ProcessPoolExecutor:
+    """ProcessPoolExecutor using the spawn start method when called from a non-main thread."""
+    context = None
+    if threading.current_thread() is not threading.main_thread():
+        context = multiprocessing.get_context('spawn')
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
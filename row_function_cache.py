@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+
+DEFAULT_CACHE_DIR = ".cache/row_functions"
+
+# (cache dir, key) -> lock held while that entry is looked up and generated
+_key_locks = {}
+_key_locks_lock = threading.Lock()
+
+
+class RowFunctionCache:
+    """Content-addressed, size-bounded LRU cache of generated row functions on disk.
+
+    Each entry is a JSON file named by its key. Reads refresh the file's mtime, and
+    writes evict the least recently used entries beyond max_entries.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, max_entries: int = 128):
+        self.cache_dir = Path(cache_dir)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(columns: List[str], sample_rows: List[dict], prompt_version: str, models: List[str]) -> str:
+        """Hash everything that determines the generated code into a cache key."""
+        payload = json.dumps(
+            {
+                'columns': list(columns),
+                'sample_rows': sample_rows,
+                'prompt_version': prompt_version,
+                'models': list(models)
+            },
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[str]:
+        """Return cached code for key, or None on a miss."""
+        path = self._entry_path(key)
+        try:
+            with open(path, 'r') as f:
+                entry = json.load(f)
+            code = entry['code']
+            compile(code, '<cached row function>', 'exec')
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (ValueError, KeyError, SyntaxError):
+            # Corrupt or invalid entry: drop it and treat as a miss
+            path.unlink(missing_ok=True)
+            self.misses += 1
+            return None
+
+        os.utime(path)
+        self.hits += 1
+        return code
+
+    def put(self, key: str, code: str, model: Optional[str] = None) -> bool:
+        """Store validated code under key. Returns False if the code doesn't compile."""
+        try:
+            compile(code, '<generated row function>', 'exec')
+        except SyntaxError:
+            return False
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entry = {'code': code, 'model': model, 'created_at': time.time()}
+
+        # Write atomically so concurrent runs never read a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, self._entry_path(key))
+
+        self._evict()
+        return True
+
+    def _evict(self):
+        """Remove least recently used entries beyond max_entries."""
+        entries = []
+        for path in self.cache_dir.glob('*.json'):
+            try:
+                entries.append((path.stat().st_mtime_ns, path))
+            except FileNotFoundError:
+                continue
+
+        entries.sort(reverse=True)
+        for _, path in entries[self.max_entries:]:
+            path.unlink(missing_ok=True)
+
+    def key_lock(self, key: str) -> threading.Lock:
+        """Lock for one entry, so threads sharing the cache generate each entry only once."""
+        with _key_locks_lock:
+            return _key_locks.setdefault((str(self.cache_dir.resolve()), key), threading.Lock())
+
+    def stats(self) -> dict:
+        """Hit/miss counters for this process."""
+        return {'hits': self.hits, 'misses': self.misses, 'cache_dir': str(self.cache_dir)}
@@ -1,20 +1,136 @@
+import builtins
+import datetime
 import os
+import random
+import numpy as np
 import pandas as pd
-from google import genai
 from google.genai import types
 import json
 import re
 import time
-from typing import Optional
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from pprint import pformat
+import faker
+from faker import Faker
+from types import ModuleType
+from typing import Callable, Iterator, List, Optional, Union
+from data_io import FORMAT_EXTENSIONS, OUTPUT_FORMATS, TableWriter, write_table
+from llm_backends import DEFAULT_CASSETTE, LLM_MODES, create_backend
+from llm_client import CircuitOpenError, GeminiClient
+from row_function_cache import DEFAULT_CACHE_DIR, RowFunctionCache
+from process_pool import process_pool
+from telemetry import Telemetry
+from value_pools import DEFAULT_POOL_SIZE, get_pools
+
+
+# Bump whenever the prompt changes so cached row functions are regenerated
+PROMPT_VERSION = "3"
+
+# Fallback row function; __PROFILE__ is replaced with the column profile and
+# `pools` (value_pools.ValuePools) is provided by the execution namespace
+FALLBACK_TEMPLATE = """import numpy as np
+
+PROFILE = __PROFILE__
+
+
+def _generate_column(spec, n):
+    kind = spec['kind']
+    if kind == 'category':
+        weights = np.asarray(spec['weights'], dtype=float)
+        values = np.asarray(spec['values'], dtype=object)
+        column = values[np.random.choice(len(values), size=n, p=weights / weights.sum())]
+    elif kind == 'date':
+        start = np.datetime64(spec['min'], 'D')
+        span = int((np.datetime64(spec['max'], 'D') - start).astype(int)) + 1
+        column = np.datetime_as_string(start + np.random.randint(0, span, size=n), unit='D').astype(object)
+    elif kind == 'numeric':
+        if 'bin_edges' in spec:
+            edges = np.asarray(spec['bin_edges'], dtype=float)
+            weights = np.asarray(spec['bin_weights'], dtype=float)
+            bins = np.random.choice(len(weights), size=n, p=weights / weights.sum())
+            column = np.random.uniform(edges[bins], edges[bins + 1])
+        else:
+            column = np.random.normal(spec['mean'], spec['std'], size=n).clip(spec['min'], spec['max'])
+        column = np.rint(column).astype(np.int64) if spec['integer'] else column.round(spec['decimals'])
+    elif kind == 'faker':
+        column = pools.sample(spec['provider'], n)
+    else:
+        column = np.full(n, None, dtype=object)
+
+    if spec.get('null_rate'):
+        # Numeric columns keep a float dtype with NaN; everything else uses None
+        column = column.astype(float if kind == 'numeric' else object)
+        column[np.random.random(n) < spec['null_rate']] = np.nan if kind == 'numeric' else None
+    return column
+
+
+def generate_batch(n):
+    return {col: _generate_column(spec, n) for col, spec in PROFILE.items()}
+
+
+def generate_row():
+    return {col: values.tolist()[0] for col, values in generate_batch(1).items()}
+"""
 
 
 class SyntheticDataGenerator:
-    def __init__(self, api_key: Optional[str] = None):
-        """Initialize the generator with Gemini API key."""
+    # Models in order of preference (best to fallback)
+    models_to_try = [
+        'gemini-2.5-pro',           # Best quality
+        'gemini-2.5-flash',         # Good balance
+        'gemini-2.0-flash-001',     # Stable fallback
+        'gemini-flash-latest'       # Latest stable
+    ]
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        cache: Optional[RowFunctionCache] = None,
+        refresh_cache: bool = False,
+        hedge_delay: Optional[float] = None,
+        model_timeout: float = 120.0,
+        llm_client: Optional[GeminiClient] = None,
+        requests_per_minute: Optional[float] = 60,
+        llm_mode: str = 'live',
+        cassette_path: Optional[str] = None,
+        replay_latency: float = 0.0,
+        pool_config: Optional[dict] = None,
+        telemetry: Optional[Telemetry] = None
+    ):
+        """Initialize the generator with Gemini API key.
+
+        Args:
+            api_key: Gemini API key (optional, can use env var)
+            cache: Row function cache to consult before calling Gemini (optional)
+            refresh_cache: Ignore cached entries and overwrite them with fresh responses
+            hedge_delay: Seconds to wait on a model before racing the next one
+                (0 sends to all models at once; None tries models one at a time)
+            model_timeout: Per-request timeout in seconds for each model call
+            llm_client: Shared Gemini client (optional, created from api_key by default)
+            requests_per_minute: Gemini rate limit when creating the client (None disables it)
+            llm_mode: 'live', 'record', 'replay' or 'stub' (replay and stub need no API key)
+            cassette_path: Cassette file for record/replay/stub modes
+            replay_latency: Synthetic latency in seconds per replayed response
+            pool_config: Keyword arguments for the shared value_pools.ValuePools
+                (pool_size, sizes, unique, persist_dir, locale)
+            telemetry: Records time, CPU, peak RSS and rows/sec of the generation steps (optional)
+        """
         self.api_key = api_key or os.getenv('GEMINI_API_KEY')
-        if not self.api_key:
-            raise ValueError("GEMINI_API_KEY must be set in environment or passed as argument")
-        self.client = genai.Client(api_key=self.api_key)
+        if llm_client is None:
+            backend = create_backend(llm_mode, api_key=self.api_key, cassette_path=cassette_path, latency=replay_latency)
+            if llm_mode in ('replay', 'stub'):
+                # Local responses: rate limiting would only distort offline profiling
+                requests_per_minute = None
+            llm_client = GeminiClient(requests_per_minute=requests_per_minute, backend=backend)
+        self.llm = llm_client
+        self.pool_config = pool_config or {}
+        self.cache = cache
+        self.refresh_cache = refresh_cache
+        self.hedge_delay = hedge_delay
+        self.model_timeout = model_timeout
+        self.telemetry = telemetry or Telemetry(enabled=False)
 
     def analyze_sample_csv(self, sample_csv_path: str) -> tuple[pd.DataFrame, dict]:
         """Read and analyze the sample CSV file."""
@@ -24,7 +140,8 @@ class SyntheticDataGenerator:
             'columns': list(df.columns),
             'column_count': len(df.columns),
             'sample_rows': df.head(5).to_dict('records'),
-            'dtypes': {col: str(dtype) for col, dtype in df.dtypes.items()}
+            'dtypes': {col: str(dtype) for col, dtype in df.dtypes.items()},
+            'profile': self._profile_columns(df)
         }
         
         return df, analysis
@@ -42,68 +159,148 @@ Columns: {columns}
 Sample data: {json.dumps(analysis['sample_rows'][:2], indent=1)}
 
 Create function 'generate_row()' that returns dict with keys: {columns}
-Use random, faker, datetime, numpy. Keep it concise but realistic.
+Also create a vectorized function 'generate_batch(n)' that returns a dict with the same keys,
+where each value is a NumPy array of length n. generate_batch must not loop over rows;
+use numpy sampling (np.random.choice, np.random.randint, np.random.normal, ...) per column.
+For Faker-style values do NOT create Faker(): a global `pools` object is predefined (don't import it).
+Use pools.sample('<faker provider>', n) in generate_batch and pools.choice('<faker provider>') in
+generate_row, e.g. pools.sample('email', n), pools.choice('company').
+Use random, datetime, numpy. Keep it concise but realistic.
 Return ONLY the complete Python code, no explanations.
 """
         
-        # Retry logic for API calls
+        if self.cache is None:
+            return self._request_row_function(prompt, columns, analysis)
+        
+        cache_key = self.cache.make_key(columns, analysis['sample_rows'], PROMPT_VERSION, self.models_to_try)
+        # Concurrent callers sharing the cache (e.g. batch jobs) wait for one Gemini call per key
+        with self.cache.key_lock(cache_key):
+            if self.refresh_cache:
+                print(f"   🔁 Refreshing cached row function ({cache_key[:12]})")
+            else:
+                cached_code = self.cache.get(cache_key)
+                if cached_code:
+                    print(f"   💾 Row function cache hit ({cache_key[:12]}), skipping Gemini")
+                    return cached_code
+                print(f"   💾 Row function cache miss ({cache_key[:12]})")
+            return self._request_row_function(prompt, columns, analysis, cache_key)
+
+    def _request_row_function(self, prompt: str, columns: list, analysis: dict, cache_key: Optional[str] = None) -> str:
+        """Ask Gemini for the row function (caching it under cache_key), or fall back."""
+        # Retry logic for API calls; circuit breakers skip models that keep failing
         max_retries = 3
         for attempt in range(max_retries):
+            if not self.llm.available_models(self.models_to_try):
+                print(f"   ⛔ All model circuits are open, skipping Gemini")
+                break
+            
             try:
                 print(f"   🔄 Attempt {attempt + 1}/{max_retries}...")
                 
-                # Try different models in order of preference (best to fallback)
-                models_to_try = [
-                    'gemini-2.5-pro',           # Best quality
-                    'gemini-2.5-flash',         # Good balance
-                    'gemini-2.0-flash-001',     # Stable fallback
-                    'gemini-flash-latest'       # Latest stable
-                ]
-                response = None
-                
-                for model in models_to_try:
-                    try:
-                        print(f"   🤖 Trying model: {model}")
-                        response = self.client.models.generate_content(
-                            model=model,
-                            contents=prompt,
-                            config=types.GenerateContentConfig(
-                                temperature=0.7,
-                                max_output_tokens=4000,
-                            )
-                        )
-                        if response and hasattr(response, 'text') and response.text:
-                            print(f"   ✅ Model {model} responded successfully")
-                            break
-                        else:
-                            print(f"   ⚠️  Model {model} returned empty response")
-                    except Exception as model_error:
-                        print(f"   ⚠️  Model {model} failed: {str(model_error)}")
-                        continue
-                
-                if not response or not hasattr(response, 'text'):
-                    raise ValueError("Gemini API returned invalid response structure.")
-                
-                if response.text is None or response.text.strip() == "":
-                    raise ValueError("Gemini API returned empty response.")
-                
-                code = self._extract_code(response.text)
-                if code and len(code.strip()) > 50:  # Basic validation
-                    print(f"   ✅ Successfully generated function code")
-                    return code
+                if self.hedge_delay is None:
+                    code, model = self._try_models_sequentially(prompt)
                 else:
-                    raise ValueError("Generated code is too short or invalid.")
+                    code, model = self._race_models(prompt)
+                
+                print(f"   ✅ Successfully generated function code")
+                if cache_key and self.cache.put(cache_key, code, model=model):
+                    print(f"   💾 Cached row function ({cache_key[:12]})")
+                return code
                     
             except Exception as e:
                 print(f"   ⚠️  Attempt {attempt + 1} failed: {str(e)}")
                 if attempt < max_retries - 1:
-                    print(f"   ⏳ Retrying in 2 seconds...")
-                    time.sleep(2)
-                else:
-                    print(f"   🔄 All attempts failed, using fallback generator...")
-                    return self._generate_fallback_function(columns)
+                    delay = self.llm.backoff_delay(attempt)
+                    print(f"   ⏳ Retrying in {delay:.1f} seconds...")
+                    time.sleep(delay)
+        
+        print(f"   🔄 All attempts failed, using fallback generator...")
+        return self._generate_fallback_function(columns, analysis.get('profile'))
+
+    def _request_code(self, model: str, prompt: str) -> str:
+        """Call one model and return its extracted code, raising if the response is unusable."""
+        response = self.llm.generate_content(
+            model=model,
+            contents=prompt,
+            config=types.GenerateContentConfig(
+                temperature=0.7,
+                max_output_tokens=4000,
+                http_options=types.HttpOptions(timeout=int(self.model_timeout * 1000)),
+            )
+        )
+        
+        if not response or not hasattr(response, 'text'):
+            raise ValueError("Gemini API returned invalid response structure.")
+        
+        if response.text is None or response.text.strip() == "":
+            raise ValueError("Gemini API returned empty response.")
+        
+        code = self._extract_code(response.text)
+        if not code or len(code.strip()) <= 50:  # Basic validation
+            raise ValueError("Generated code is too short or invalid.")
+        
+        return code
+
+    def _try_models_sequentially(self, prompt: str) -> tuple[str, str]:
+        """Try each model in order of preference; return the first valid (code, model)."""
+        for model in self.models_to_try:
+            try:
+                print(f"   🤖 Trying model: {model}")
+                code = self._request_code(model, prompt)
+                print(f"   ✅ Model {model} responded successfully")
+                return code, model
+            except CircuitOpenError as skipped:
+                print(f"   ⏭️  {skipped}")
+            except Exception as model_error:
+                print(f"   ⚠️  Model {model} failed: {str(model_error)}")
         
-        raise ValueError("Unexpected error in retry loop.")
+        raise ValueError("All models failed to return valid code.")
+
+    def _race_models(self, prompt: str) -> tuple[str, str]:
+        """Hedged request: start the preferred model, add a backup request every
+        hedge_delay seconds (or as soon as one fails), and return the first valid
+        (code, model). Requests still in flight are abandoned; each is bounded by
+        model_timeout.
+        """
+        models = iter(self.models_to_try)
+        executor = ThreadPoolExecutor(max_workers=len(self.models_to_try))
+        in_flight = {}
+        
+        def launch_next() -> bool:
+            model = next(models, None)
+            if model is None:
+                return False
+            print(f"   🤖 Racing model: {model}")
+            in_flight[executor.submit(self._request_code, model, prompt)] = model
+            return True
+        
+        try:
+            launch_next()
+            if self.hedge_delay == 0:
+                while launch_next():
+                    pass
+            
+            while in_flight:
+                done, _ = wait(in_flight, timeout=self.hedge_delay or None, return_when=FIRST_COMPLETED)
+                if not done:
+                    # Preferred model is slow: hedge with a backup request
+                    launch_next()
+                    continue
+                
+                for future in done:
+                    model = in_flight.pop(future)
+                    try:
+                        code = future.result()
+                    except Exception as model_error:
+                        print(f"   ⚠️  Model {model} failed: {str(model_error)}")
+                        launch_next()
+                        continue
+                    print(f"   ✅ Model {model} won the race")
+                    return code, model
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        raise ValueError("All models failed to return valid code.")
 
     def _extract_code(self, response_text: str) -> str:
         """Extract Python code from markdown code blocks."""
@@ -151,86 +348,213 @@ Return ONLY the complete Python code, no explanations.
         
         raise ValueError("No valid Python code found in response.")
 
-    def _generate_fallback_function(self, columns: list) -> str:
-        """Generate a simple fallback function when API fails."""
+    def _generate_fallback_function(self, columns: list, profile: Optional[dict] = None) -> str:
+        """Generate a vectorized fallback function when the API fails.
+
+        Columns are sampled with NumPy from the per-column profile fitted on the sample
+        (category frequencies, numeric histograms, date ranges). Columns without a
+        profile get one from name-based heuristics.
+        """
         print(f"   🔧 Generating fallback function for {len(columns)} columns...")
         
-        function_code = """import random
-import string
-from datetime import datetime, timedelta
-from faker import Faker
-
-fake = Faker()
+        profile = profile or {}
+        heuristics = self._heuristic_profile([col for col in columns if col not in profile])
+        column_profile = {col: profile.get(col) or heuristics[col] for col in columns}
+        
+        return FALLBACK_TEMPLATE.replace('__PROFILE__', pformat(column_profile, width=100, sort_dicts=False))
 
-def generate_row():
-    return {"""
+    def _profile_columns(self, df: pd.DataFrame) -> dict:
+        """Fit a per-column profile of the sample for the fallback generator."""
+        profile = {}
         
-        for i, col in enumerate(columns):
-            if i > 0:
-                function_code += ",\n        "
+        for col in df.columns:
+            values = df[col].dropna()
+            
+            if values.empty:
+                spec = {'kind': 'empty'}
+            elif pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+                spec = self._profile_numeric(values)
             else:
-                function_code += "\n        "
+                dates = pd.to_datetime(values.astype(str), format='%Y-%m-%d', errors='coerce')
+                if dates.notna().all():
+                    spec = {
+                        'kind': 'date',
+                        'min': dates.min().strftime('%Y-%m-%d'),
+                        'max': dates.max().strftime('%Y-%m-%d')
+                    }
+                else:
+                    freqs = values.astype(str).value_counts(normalize=True)
+                    spec = {
+                        'kind': 'category',
+                        'values': freqs.index.tolist(),
+                        'weights': [round(float(w), 6) for w in freqs.values]
+                    }
             
-            # Simple heuristics for column types
+            spec['null_rate'] = round(1 - len(values) / len(df), 4) if len(df) else 0.0
+            profile[col] = spec
+        
+        return profile
+
+    def _profile_numeric(self, values: pd.Series) -> dict:
+        """Range, moments and (given enough distinct values) a histogram of a numeric column."""
+        values = values.astype(float)
+        is_integer = bool((values == values.round()).all())
+        decimals = 0
+        if not is_integer:
+            decimals = min(6, max(len(repr(v).split('.')[-1]) for v in values if v != round(v)))
+        
+        spec = {
+            'kind': 'numeric',
+            'integer': is_integer,
+            'decimals': decimals,
+            'min': float(values.min()),
+            'max': float(values.max()),
+            'mean': float(values.mean()),
+            'std': float(values.std(ddof=0))
+        }
+        
+        if values.nunique() >= 10:
+            counts, edges = np.histogram(values, bins=min(20, values.nunique()))
+            spec['bin_edges'] = [float(e) for e in edges]
+            spec['bin_weights'] = [round(float(c) / counts.sum(), 6) for c in counts]
+        
+        return spec
+
+    def _heuristic_profile(self, columns: list) -> dict:
+        """Name-based column profiles for columns the sample can't describe."""
+        today = datetime.date.today()
+        profile = {}
+        
+        for col in columns:
             col_lower = col.lower()
             if any(word in col_lower for word in ['id', 'key', 'index']):
-                function_code += f'"{col}": random.randint(1, 10000)'
+                spec = {'kind': 'numeric', 'integer': True, 'decimals': 0, 'bin_edges': [1.0, 10000.0], 'bin_weights': [1.0]}
             elif any(word in col_lower for word in ['date', 'time', 'created', 'updated']):
-                function_code += f'"{col}": fake.date_between(start_date="-1y", end_date="today").strftime("%Y-%m-%d")'
+                spec = {'kind': 'date', 'min': str(today - datetime.timedelta(days=365)), 'max': str(today)}
             elif any(word in col_lower for word in ['email', 'mail']):
-                function_code += f'"{col}": fake.email()'
+                spec = {'kind': 'faker', 'provider': 'email'}
             elif any(word in col_lower for word in ['name', 'title']):
-                function_code += f'"{col}": fake.name()'
+                spec = {'kind': 'faker', 'provider': 'name'}
             elif any(word in col_lower for word in ['amount', 'price', 'cost', 'revenue', 'value']):
-                function_code += f'"{col}": round(random.uniform(10, 1000), 2)'
+                spec = {'kind': 'numeric', 'integer': False, 'decimals': 2, 'bin_edges': [10.0, 1000.0], 'bin_weights': [1.0]}
             elif any(word in col_lower for word in ['count', 'number', 'quantity']):
-                function_code += f'"{col}": random.randint(1, 100)'
+                spec = {'kind': 'numeric', 'integer': True, 'decimals': 0, 'bin_edges': [1.0, 100.0], 'bin_weights': [1.0]}
             elif any(word in col_lower for word in ['status', 'type', 'category']):
-                function_code += f'"{col}": random.choice(["active", "inactive", "pending", "completed"])'
+                spec = {'kind': 'category', 'values': ['active', 'inactive', 'pending', 'completed'], 'weights': [0.25] * 4}
             else:
-                function_code += f'"{col}": fake.word()'
-        
-        function_code += "\n    }"
+                spec = {'kind': 'faker', 'provider': 'word'}
+            
+            spec['null_rate'] = 0.0
+            profile[col] = spec
         
-        return function_code
+        return profile
 
     def list_available_models(self):
         """List all available models for debugging."""
         try:
             print("📋 Available models:")
-            for model in self.client.models.list():
-                print(f"   - {model.name}")
+            for model in self.llm.list_models():
+                print(f"   - {model}")
         except Exception as e:
             print(f"❌ Error listing models: {e}")
 
-    def execute_generation(self, function_code: str, num_rows: int) -> pd.DataFrame:
-        """Execute the generated function to create synthetic data."""
-        namespace = {}
-        exec(function_code, namespace)
+    def execute_generation(
+        self,
+        function_code: str,
+        num_rows: int,
+        workers: int = 1,
+        seed: Optional[int] = None
+    ) -> pd.DataFrame:
+        """Execute the generated function to create synthetic data.
+
+        Rows are split into one shard per worker. Each shard runs in its own process
+        with an independent random/numpy/Faker stream derived from ``seed``, and shards
+        are concatenated in order, so a given seed and worker count reproduce the same data.
+        """
+        shard_sizes = _shard_sizes(num_rows, workers)
+        shard_seeds = _shard_seeds(seed, len(shard_sizes))
         
-        if 'generate_row' not in namespace:
-            raise ValueError("Generated code doesn't contain 'generate_row' function")
+        shards = list(_iter_shards(function_code, shard_sizes, shard_seeds, workers, self.pool_config))
+        if len(shards) == 1:
+            return shards[0]
         
-        generate_row = namespace['generate_row']
+        return pd.concat(shards, ignore_index=True)
+
+    def iter_generation(
+        self,
+        function_code: str,
+        num_rows: int,
+        chunk_size: int,
+        workers: int = 1,
+        seed: Optional[int] = None
+    ) -> Iterator[pd.DataFrame]:
+        """Yield synthetic data in order, in DataFrames of at most chunk_size rows.
+
+        Every chunk is an independently seeded shard, so output for a given seed and
+        chunk size doesn't depend on the worker count, and at most two chunks per
+        worker are held in memory at once.
+        """
+        chunk_sizes = _chunk_sizes(num_rows, chunk_size)
+        chunk_seeds = _shard_seeds(seed, len(chunk_sizes))
+        yield from _iter_shards(function_code, chunk_sizes, chunk_seeds, workers, self.pool_config)
+
+    def stream_to_file(
+        self,
+        function_code: str,
+        num_rows: int,
+        output_path: str,
+        chunk_size: int,
+        workers: int = 1,
+        seed: Optional[int] = None,
+        output_format: Optional[str] = None
+    ) -> dict:
+        """Generate rows chunk by chunk, appending each chunk to output_path.
+
+        Peak memory depends on chunk_size and workers, not num_rows. Returns a summary
+        of the written file instead of the data itself.
+        """
+        num_chunks = 0
         
-        rows = []
-        for _ in range(num_rows):
-            row = generate_row()
-            rows.append(row)
+        with TableWriter(output_path, output_format) as writer:
+            for chunk in self.iter_generation(function_code, num_rows, chunk_size, workers=workers, seed=seed):
+                with self.telemetry.step('write', rows=len(chunk)):
+                    writer.write(chunk)
+                num_chunks += 1
+                del chunk
+                print(f"   💾 Wrote {writer.rows_written:,}/{num_rows:,} rows")
         
-        df = pd.DataFrame(rows)
-        return df
+        return {
+            'path': output_path,
+            'format': writer.output_format,
+            'rows': writer.rows_written,
+            'columns': writer.columns or [],
+            'dtypes': writer.dtypes,
+            'chunks': num_chunks
+        }
 
     def generate_synthetic_data(
         self, 
         sample_csv_path: str, 
         num_rows: int,
         num_columns: Optional[int] = None,
-        output_path: Optional[str] = None
-    ) -> pd.DataFrame:
-        """Generate synthetic data based on sample CSV."""
+        output_path: Optional[str] = None,
+        workers: int = 1,
+        seed: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+        output_format: Optional[str] = None
+    ) -> Union[pd.DataFrame, dict]:
+        """Generate synthetic data based on sample CSV.
+
+        output_format is 'csv', 'parquet' or 'arrow' (inferred from output_path by default).
+        With chunk_size set, rows are streamed to output_path and a summary dict
+        (path, format, rows, columns, dtypes, chunks) is returned instead of the DataFrame.
+        """
+        if chunk_size and not output_path:
+            raise ValueError("Streaming generation (chunk_size) requires an output_path")
+        
         print(f"📊 Analyzing sample CSV: {sample_csv_path}")
-        df_sample, analysis = self.analyze_sample_csv(sample_csv_path)
+        with self.telemetry.step('analyze_sample'):
+            df_sample, analysis = self.analyze_sample_csv(sample_csv_path)
         
         if num_columns and num_columns > len(analysis['columns']):
             num_columns = len(analysis['columns'])
@@ -239,7 +563,8 @@ def generate_row():
         print(f"📝 Columns to generate: {num_columns or analysis['column_count']}")
         print(f"🤖 Generating row creation function using Gemini...")
         
-        function_code = self.generate_row_function(analysis, num_columns)
+        with self.telemetry.step('row_function'):
+            function_code = self.generate_row_function(analysis, num_columns)
         
         print(f"\n{'='*60}")
         print("Generated Function Code:")
@@ -247,17 +572,196 @@ def generate_row():
         print(function_code)
         print(f"{'='*60}\n")
         
-        print(f"⚙️  Executing function to generate {num_rows} rows...")
-        df_synthetic = self.execute_generation(function_code, num_rows)
+        if chunk_size:
+            print(f"⚙️  Streaming {num_rows} rows in chunks of {chunk_size} with {workers} worker(s)...")
+            # Chunks are generated while earlier ones are written, so 'stream' covers both
+            with self.telemetry.step('stream', rows=num_rows):
+                summary = self.stream_to_file(
+                    function_code, num_rows, output_path, chunk_size,
+                    workers=workers, seed=seed, output_format=output_format
+                )
+            print(f"✅ Saved synthetic data to: {output_path}")
+            print(f"✅ Generated {summary['rows']} rows with {len(summary['columns'])} columns")
+            return summary
+        
+        print(f"⚙️  Executing function to generate {num_rows} rows with {workers} worker(s)...")
+        with self.telemetry.step('execute', rows=num_rows):
+            df_synthetic = self.execute_generation(function_code, num_rows, workers=workers, seed=seed)
         
         if output_path:
-            df_synthetic.to_csv(output_path, index=False)
+            with self.telemetry.step('write', rows=len(df_synthetic)):
+                write_table(df_synthetic, output_path, output_format)
             print(f"✅ Saved synthetic data to: {output_path}")
         
         print(f"✅ Generated {len(df_synthetic)} rows with {len(df_synthetic.columns)} columns")
         return df_synthetic
 
 
+def _shard_sizes(num_rows: int, workers: int) -> List[int]:
+    """Split num_rows into at most `workers` contiguous, near-equal shards."""
+    num_shards = max(1, min(workers, num_rows))
+    base, extra = divmod(num_rows, num_shards)
+    return [base + (1 if i < extra else 0) for i in range(num_shards)]
+
+
+def _chunk_sizes(num_rows: int, chunk_size: int) -> List[int]:
+    """Split num_rows into consecutive chunks of chunk_size rows (last one may be smaller)."""
+    full, remainder = divmod(num_rows, chunk_size)
+    return [chunk_size] * full + ([remainder] if remainder else [])
+
+
+def _shard_seeds(seed: Optional[int], num_shards: int) -> List[int]:
+    """Derive an independent seed per shard from a single root seed.
+
+    Without a root seed, shards are seeded from fresh OS entropy: forked workers
+    inherit the parent's RNG state, so unseeded shards would repeat each other's rows.
+    """
+    if seed is not None and num_shards == 1:
+        return [seed]
+    children = np.random.SeedSequence(seed).spawn(num_shards)
+    return [int(child.generate_state(1)[0]) for child in children]
+
+
+def _iter_shards(
+    function_code: str,
+    sizes: List[int],
+    seeds: List[Optional[int]],
+    workers: int,
+    pool_config: Optional[dict] = None
+) -> Iterator[pd.DataFrame]:
+    """Generate shards in order, keeping at most 2 * workers shards in flight."""
+    if workers <= 1 or len(sizes) <= 1:
+        for size, shard_seed in zip(sizes, seeds):
+            yield _generate_shard(function_code, size, shard_seed, pool_config)
+        return
+    
+    tasks = iter(zip(sizes, seeds))
+    with process_pool(min(workers, len(sizes))) as executor:
+        pending = deque(
+            executor.submit(_generate_shard, function_code, size, shard_seed, pool_config)
+            for size, shard_seed in islice(tasks, 2 * workers)
+        )
+        while pending:
+            shard = pending.popleft().result()
+            for size, shard_seed in islice(tasks, 1):
+                pending.append(executor.submit(_generate_shard, function_code, size, shard_seed, pool_config))
+            yield shard
+
+
+def _generate_shard(
+    function_code: str,
+    num_rows: int,
+    seed: Optional[int] = None,
+    pool_config: Optional[dict] = None
+) -> pd.DataFrame:
+    """Run the generated code for one shard (in this process or a worker process)."""
+    namespace = _shard_namespace(seed, pool_config)
+    exec(function_code, namespace)
+    
+    if 'generate_batch' in namespace:
+        try:
+            return _build_batch_frame(namespace, num_rows)
+        except Exception as e:
+            print(f"   ⚠️  generate_batch failed validation ({e}), using per-row generation...")
+    
+    if 'generate_row' not in namespace:
+        raise ValueError("Generated code doesn't contain 'generate_row' function")
+    
+    generate_row = namespace['generate_row']
+    
+    rows = []
+    for _ in range(num_rows):
+        row = generate_row()
+        rows.append(row)
+    
+    df = pd.DataFrame(rows)
+    return df
+
+
+class _ModuleView(ModuleType):
+    """A module with some attributes replaced; the rest are looked up on the module."""
+
+    def __init__(self, module: ModuleType, overrides: dict):
+        super().__init__(module.__name__, module.__doc__)
+        self.__dict__.update(overrides)
+        self._module = module
+
+    def __getattr__(self, name: str):
+        return getattr(self._module, name)
+
+
+def _bound_methods(rng) -> dict:
+    return {name: getattr(rng, name) for name in dir(rng) if not name.startswith('_') and callable(getattr(rng, name))}
+
+
+def _shard_import(modules: dict) -> Callable:
+    """__import__ that hands out the shard's module stand-ins (also for `from x import y`)."""
+    def _import(name, globals=None, locals=None, fromlist=(), level=0):
+        top = name.partition('.')[0]
+        if level == 0 and top in modules:
+            if not fromlist:
+                return modules[top]
+            if name in modules:
+                return modules[name]
+        return builtins.__import__(name, globals, locals, fromlist, level)
+    return _import
+
+
+def _shard_namespace(seed: Optional[int], pool_config: Optional[dict] = None) -> dict:
+    """Globals for running generated code with its own RNG instead of process-global state.
+
+    The code's imports of numpy, numpy.random, random and faker get stand-ins whose
+    random functions are bound to a RandomState, a random.Random and Faker instances
+    seeded with `seed` (the same streams np.random.seed(seed) and random.seed(seed)
+    would give), and `pools` samples from the same RandomState. Shards running at the
+    same time in one process (e.g. batch_runner jobs) thus never share RNG state.
+    """
+    random_state = np.random.RandomState(None if seed is None else seed % 2**32)
+    numpy_random = _ModuleView(np.random, _bound_methods(random_state))
+    
+    class SeededFaker(Faker):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.seed_instance(seed)
+    
+    modules = {
+        'numpy': _ModuleView(np, {'random': numpy_random}),
+        'numpy.random': numpy_random,
+        'random': _ModuleView(random, _bound_methods(random.Random(seed))),
+        'faker': _ModuleView(faker, {'Faker': SeededFaker})
+    }
+    return {
+        '__builtins__': dict(vars(builtins), __import__=_shard_import(modules)),
+        # Value pools are built once per process and shared by every shard it runs
+        'pools': get_pools(pool_config).with_random_state(random_state)
+    }
+
+
+def _build_batch_frame(namespace: dict, num_rows: int) -> pd.DataFrame:
+    """Build a DataFrame from generate_batch(n), validating its column arrays."""
+    batch = namespace['generate_batch'](num_rows)
+    
+    if not isinstance(batch, dict) or not batch:
+        raise ValueError("generate_batch must return a non-empty dict of arrays")
+    
+    # generate_row defines the expected schema and column order when present
+    columns = list(batch.keys())
+    if 'generate_row' in namespace:
+        expected = list(namespace['generate_row']().keys())
+        if set(expected) != set(columns):
+            raise ValueError(f"columns {columns} don't match generate_row keys {expected}")
+        columns = expected
+    
+    data = {}
+    for col in columns:
+        values = np.asarray(batch[col])
+        if values.ndim != 1 or len(values) != num_rows:
+            raise ValueError(f"column '{col}' has shape {values.shape}, expected ({num_rows},)")
+        data[col] = values
+    
+    return pd.DataFrame(data, columns=columns)
+
+
 def main():
     """CLI interface for the synthetic data generator."""
     import argparse
@@ -269,22 +773,58 @@ def main():
     parser.add_argument('sample_csv', help='Path to sample CSV file')
     parser.add_argument('--rows', type=int, required=True, help='Number of rows to generate')
     parser.add_argument('--columns', type=int, help='Number of columns to use (optional, uses all by default)')
-    parser.add_argument('--output', '-o', help='Output CSV path (optional)')
+    parser.add_argument('--output', '-o', help='Output file path (optional)')
+    parser.add_argument('--format', '-f', choices=OUTPUT_FORMATS, help='Output format: csv, parquet or arrow (default: from --output extension, else csv)')
     parser.add_argument('--api-key', help='Gemini API key (or set GEMINI_API_KEY env var)')
+    parser.add_argument('--workers', type=int, default=1, help='Number of worker processes for row generation (default: 1)')
+    parser.add_argument('--seed', type=int, help='Random seed for reproducible output (optional)')
+    parser.add_argument('--chunk-size', type=int, help='Stream rows to the output CSV in chunks of this size (constant memory)')
+    parser.add_argument('--hedge-delay', type=float, help='Race models: start a backup model after this many seconds (0 = all at once)')
+    parser.add_argument('--model-timeout', type=float, default=120.0, help='Timeout in seconds for each model request (default: 120)')
+    parser.add_argument('--rpm', type=float, default=60, help='Max Gemini requests per minute, shared across processes (default: 60, 0 disables)')
+    parser.add_argument('--llm-mode', choices=LLM_MODES, default='live', help='live, record to a cassette, replay a cassette, or serve it from a local stub API (default: live)')
+    parser.add_argument('--cassette', default=DEFAULT_CASSETTE, help=f'Cassette file for record/replay/stub (default: {DEFAULT_CASSETTE})')
+    parser.add_argument('--replay-latency', type=float, default=0.0, help='Synthetic latency in seconds per replayed response (default: 0)')
+    parser.add_argument('--pool-size', type=int, default=DEFAULT_POOL_SIZE, help=f'Values pre-generated per Faker provider (default: {DEFAULT_POOL_SIZE})')
+    parser.add_argument('--pool-dir', help='Directory to persist and reuse Faker value pools (optional)')
+    parser.add_argument('--unique-pools', action='store_true', help='Build pools of distinct values')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help=f'Row function cache directory (default: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--no-cache', action='store_true', help='Always call Gemini; do not read or write the row function cache')
+    parser.add_argument('--refresh-cache', action='store_true', help='Call Gemini and overwrite the cached row function')
     
     args = parser.parse_args()
     
-    generator = SyntheticDataGenerator(api_key=args.api_key)
+    cache = None if args.no_cache else RowFunctionCache(args.cache_dir)
+    generator = SyntheticDataGenerator(
+        api_key=args.api_key,
+        cache=cache,
+        refresh_cache=args.refresh_cache,
+        hedge_delay=args.hedge_delay,
+        model_timeout=args.model_timeout,
+        requests_per_minute=args.rpm or None,
+        llm_mode=args.llm_mode,
+        cassette_path=args.cassette,
+        replay_latency=args.replay_latency,
+        pool_config={'pool_size': args.pool_size, 'persist_dir': args.pool_dir, 'unique': args.unique_pools}
+    )
     
-    output_path = args.output or f'synthetic_data_{args.rows}_rows.csv'
+    output_path = args.output or f'synthetic_data_{args.rows}_rows{FORMAT_EXTENSIONS[args.format or "csv"]}'
     
     df = generator.generate_synthetic_data(
         sample_csv_path=args.sample_csv,
         num_rows=args.rows,
         num_columns=args.columns,
-        output_path=output_path
+        output_path=output_path,
+        workers=args.workers,
+        seed=args.seed,
+        chunk_size=args.chunk_size,
+        output_format=args.format
     )
     
+    if isinstance(df, dict):
+        print(f"\n📈 Data shape: ({df['rows']}, {len(df['columns'])}) written in {df['chunks']} chunks")
+        return
+    
     print("\n📊 Preview of generated data:")
     print(df.head())
     print(f"\n📈 Data shape: {df.shape}")
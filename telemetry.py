@@ -0,0 +1,148 @@
+"""
+Per-step performance telemetry for the pipeline.
+
+Telemetry.step() measures a block of code: wall time, CPU time (of this process and of
+the worker processes it waited for), the process's peak RSS when the block ended, and
+rows/sec when the block reports how many rows it handled. A Telemetry created outside
+the main thread (a batch_runner job) counts only its own thread's CPU time, since
+process counters would include every concurrent job; peak RSS stays process-wide. Nested steps are named by
+path ("generate/execute"), and a step measured several times (e.g. once per chunk)
+accumulates into one entry. A disabled Telemetry measures nothing, so instrumented code
+needs no checks of its own.
+
+Reports are written as JSON (metrics.json) and, optionally, as a Prometheus textfile
+for the node_exporter textfile collector.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows: peak RSS is not reported
+    resource = None
+
+
+METRICS_FILE = "metrics.json"
+PROMETHEUS_PREFIX = "synthetic_data_pipeline_step"
+# Prometheus metric suffix -> (report field, help text)
+PROMETHEUS_METRICS = {
+    'wall_seconds': ('wall_seconds', 'Wall-clock time spent in the step'),
+    'cpu_seconds': ('cpu_seconds', 'CPU time of the process and its waited-for workers during the step (of the job thread only in batch jobs)'),
+    'peak_rss_bytes': ('peak_rss_bytes', 'Peak resident set size of the whole process at the end of the step (shared by concurrent batch jobs)'),
+    'rows': ('rows', 'Rows handled by the step'),
+    'rows_per_second': ('rows_per_second', 'Rows handled per second of wall time'),
+    'calls': ('calls', 'Times the step ran')
+}
+
+
+def _cpu_seconds(per_thread: bool = False) -> float:
+    if per_thread:
+        return time.thread_time()
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def _peak_rss_bytes() -> Optional[int]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _label_value(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Telemetry:
+    """Wall time, CPU time, peak RSS and rows/sec per named step."""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        # Step path -> accumulated measurements, in order of first use
+        self.steps: Dict[str, Dict[str, Any]] = {}
+        # Free-form context for the report, e.g. the eval plan summary
+        self.info: Dict[str, Any] = {}
+        self._stack: List[str] = []
+        # Other threads may be running jobs of their own, so process CPU time is not ours
+        self.per_thread = threading.current_thread() is not threading.main_thread()
+        if self.per_thread:
+            self.info['scope'] = {
+                'cpu_seconds': 'this thread only, worker processes excluded',
+                'peak_rss_bytes': 'whole process, shared by concurrent jobs'
+            }
+
+    @contextmanager
+    def step(self, name: str, rows: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Measure the enclosed block as step `name` (nested under any enclosing step).
+
+        Yields a dict whose 'rows' may be set inside the block when the row count is
+        only known at the end.
+        """
+        counters = {'rows': rows}
+        if not self.enabled:
+            yield counters
+            return
+
+        self._stack.append(name)
+        entry = self.steps.setdefault('/'.join(self._stack), {
+            'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'rows': None, 'peak_rss_bytes': None
+        })
+        wall, cpu = time.perf_counter(), _cpu_seconds(self.per_thread)
+        try:
+            yield counters
+        finally:
+            self._stack.pop()
+            entry['calls'] += 1
+            entry['wall_seconds'] += time.perf_counter() - wall
+            entry['cpu_seconds'] += _cpu_seconds(self.per_thread) - cpu
+            entry['peak_rss_bytes'] = _peak_rss_bytes()
+            if counters['rows'] is not None:
+                entry['rows'] = (entry['rows'] or 0) + counters['rows']
+
+    def report(self) -> Dict[str, Any]:
+        steps = []
+        for path, entry in self.steps.items():
+            rows_per_second = entry['rows'] / entry['wall_seconds'] if entry['rows'] and entry['wall_seconds'] > 0 else None
+            steps.append({'step': path, **entry, 'rows_per_second': rows_per_second})
+        return {**self.info, 'steps': steps}
+
+    def write_json(self, path: str, **metadata) -> str:
+        """Write the report (plus metadata, e.g. dataset and status) as JSON."""
+        _write_atomic(path, json.dumps({**metadata, **self.report()}, indent=2, default=str))
+        return str(path)
+
+    def write_prometheus(self, path: str, labels: Optional[Dict[str, Any]] = None) -> str:
+        """Write every step's measurements as Prometheus gauges labeled by step (plus labels)."""
+        steps = self.report()['steps']
+        lines = []
+        for suffix, (field, help_text) in PROMETHEUS_METRICS.items():
+            name = f"{PROMETHEUS_PREFIX}_{suffix}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for step in steps:
+                if step[field] is None:
+                    continue
+                step_labels = {**(labels or {}), 'step': step['step']}
+                label_text = ','.join(f'{key}="{_label_value(value)}"' for key, value in step_labels.items())
+                lines.append(f"{name}{{{label_text}}} {step[field]}")
+        _write_atomic(path, '\n'.join(lines) + '\n')
+        return str(path)
+
+
+def _write_atomic(path: str, text: str):
+    # The textfile collector may read at any time, so never expose a partial file
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
@@ -0,0 +1,152 @@
+import json
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+from faker import Faker
+from faker.exceptions import UniquenessException
+
+
+DEFAULT_POOL_SIZE = 10000
+
+_pools_by_config: Dict[tuple, 'ValuePools'] = {}
+_pools_lock = threading.Lock()
+
+
+class ValuePools:
+    """Pre-generated pools of Faker values, sampled by NumPy integer indexing.
+
+    Each provider (plus keyword arguments) is generated once per process, on first
+    use, from a Faker instance with a fixed seed, so every process and shard sees
+    the same pool. Sampling uses the global NumPy RNG; the generator samples through
+    with_random_state() views instead, one per shard. Pools can be persisted to disk
+    and reloaded on later runs.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        sizes: Optional[Dict[str, int]] = None,
+        unique: bool = False,
+        persist_dir: Optional[str] = None,
+        locale: Optional[str] = None,
+        seed: int = 0
+    ):
+        """
+        Args:
+            pool_size: Default number of values per pool
+            sizes: Per-provider pool size overrides, e.g. {"email": 50000}
+            unique: Build pools of distinct values, so sample(..., unique=True) never repeats;
+                providers with fewer distinct values than the pool size get smaller pools
+            persist_dir: Directory to load/save pools from/to (optional)
+            locale: Faker locale (optional)
+            seed: Seed for pool generation
+        """
+        self.pool_size = pool_size
+        self.sizes = sizes or {}
+        self.unique = unique
+        self.persist_dir = Path(persist_dir) if persist_dir else None
+        self.locale = locale
+        self.seed = seed
+        self._fake = None
+        self._pools: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def fake(self) -> Faker:
+        """Shared, lazily constructed Faker instance."""
+        if self._fake is None:
+            self._fake = Faker(self.locale)
+            self._fake.seed_instance(self.seed)
+        return self._fake
+
+    def pool(self, provider: str, **kwargs) -> np.ndarray:
+        """Return the pool for a Faker provider, generating (or loading) it on first use."""
+        key = provider + (json.dumps(kwargs, sort_keys=True, default=str) if kwargs else '')
+        values = self._pools.get(key)
+        if values is not None:
+            return values
+
+        with self._lock:
+            if key not in self._pools:
+                self._pools[key] = self._load_or_build(key, provider, kwargs)
+            return self._pools[key]
+
+    def sample(self, provider: str, n: int, unique: bool = False, **kwargs) -> np.ndarray:
+        """Draw n values from a provider's pool. unique=True draws without replacement."""
+        return _sample(self.pool(provider, **kwargs), provider, n, unique, np.random)
+
+    def choice(self, provider: str, **kwargs):
+        """Draw a single value, for per-row generate_row() functions."""
+        values = self.pool(provider, **kwargs)
+        return values[np.random.randint(0, len(values))]
+
+    def with_random_state(self, random_state: np.random.RandomState) -> 'SeededPools':
+        """A view of these pools that samples with random_state instead of the global RNG."""
+        return SeededPools(self, random_state)
+
+    def _load_or_build(self, key: str, provider: str, kwargs: dict) -> np.ndarray:
+        size = self.sizes.get(provider, self.pool_size)
+        path = None
+        if self.persist_dir is not None:
+            name = f"{self.locale or 'default'}_{size}_{'unique' if self.unique else 'any'}_{self.seed}_{key}"
+            safe_name = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in name)
+            path = self.persist_dir / f"{safe_name}.json"
+            if path.exists():
+                with open(path, 'r') as f:
+                    return np.asarray(json.load(f), dtype=object)
+
+        method = getattr(self.fake.unique if self.unique else self.fake, provider)
+        values = []
+        try:
+            for _ in range(size):
+                values.append(method(**kwargs))
+        except UniquenessException:
+            # A small domain (e.g. day_of_week): keep every distinct value found
+            print(f"   ⚠️  Only {len(values)} distinct '{provider}' values, pool size reduced from {size}")
+        if self.unique:
+            self.fake.unique.clear()
+
+        if path is not None:
+            self.persist_dir.mkdir(parents=True, exist_ok=True)
+            with open(path, 'w') as f:
+                json.dump(values, f, default=str)
+
+        return np.asarray(values, dtype=object)
+
+
+class SeededPools:
+    """ValuePools view with its own RandomState, so concurrent shards never share RNG state."""
+
+    def __init__(self, pools: ValuePools, random_state: np.random.RandomState):
+        self.pools = pools
+        self.random_state = random_state
+
+    def pool(self, provider: str, **kwargs) -> np.ndarray:
+        return self.pools.pool(provider, **kwargs)
+
+    def sample(self, provider: str, n: int, unique: bool = False, **kwargs) -> np.ndarray:
+        return _sample(self.pools.pool(provider, **kwargs), provider, n, unique, self.random_state)
+
+    def choice(self, provider: str, **kwargs):
+        values = self.pools.pool(provider, **kwargs)
+        return values[self.random_state.randint(0, len(values))]
+
+
+def _sample(values: np.ndarray, provider: str, n: int, unique: bool, random_state) -> np.ndarray:
+    if unique:
+        if n > len(values):
+            raise ValueError(f"Cannot draw {n} unique '{provider}' values from a pool of {len(values)}")
+        return values[random_state.permutation(len(values))[:n]]
+    return values[random_state.randint(0, len(values), size=n)]
+
+
+def get_pools(config: Optional[dict] = None) -> ValuePools:
+    """Process-wide ValuePools for a configuration (keyword arguments of ValuePools)."""
+    config = config or {}
+    key = json.dumps(config, sort_keys=True, default=str)
+    with _pools_lock:
+        if key not in _pools_by_config:
+            _pools_by_config[key] = ValuePools(**config)
+        return _pools_by_config[key]